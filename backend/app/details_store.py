@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+from app.ttl_cache import TTLCache
+
+PLACE_DETAILS_DB_PATH = os.getenv("PLACE_DETAILS_DB_PATH", "place_details.sqlite3")
+
+DAY = 24 * 60 * 60
+
+# Fields requested from the Place Details API and how long each stays valid
+FIELD_TTLS = {
+    "name": 30 * DAY,
+    "rating": 1 * DAY,
+    "formatted_phone_number": 30 * DAY,
+    "opening_hours": 1 * DAY,
+    "website": 30 * DAY,
+    "price_level": 7 * DAY,
+    "photos": 7 * DAY,
+}
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+class PlaceDetailsStore:
+    """
+    Persistent place_id -> details store backed by SQLite.
+
+    Each field is stored with its own fetch time so it can expire on its own
+    TTL. Details that are fully fresh are also kept in a small in-memory LRU
+    so repeat lookups skip SQLite entirely.
+    """
+
+    def __init__(self, path: str = PLACE_DETAILS_DB_PATH, memory_entries: int = 5000):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS place_details (
+                place_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (place_id, field)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._memory = TTLCache(max_entries=memory_entries, ttl=min(FIELD_TTLS.values()))
+
+    def get_many(self, place_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return details for every place_id whose fields are all still fresh"""
+        results: Dict[str, dict] = {}
+        pending: List[str] = []
+        for place_id in dict.fromkeys(place_ids):
+            details = self._memory.get(place_id)
+            if details is not None:
+                results[place_id] = details
+            else:
+                pending.append(place_id)
+
+        now = time.time()
+        rows = []
+        with self._lock:
+            for i in range(0, len(pending), _QUERY_CHUNK):
+                chunk = pending[i:i + _QUERY_CHUNK]
+                rows.extend(self._conn.execute(
+                    f"SELECT place_id, field, value, fetched_at FROM place_details "
+                    f"WHERE place_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+
+        fields: Dict[str, Dict[str, tuple]] = {}
+        for place_id, field, value, fetched_at in rows:
+            fields.setdefault(place_id, {})[field] = (value, fetched_at)
+
+        for place_id, stored in fields.items():
+            expires_at = min(
+                (stored[field][1] + ttl if field in stored else 0) for field, ttl in FIELD_TTLS.items()
+            )
+            if expires_at <= now:
+                continue
+            details = {
+                field: json.loads(value)
+                for field, (value, _) in stored.items()
+                if value is not None and field in FIELD_TTLS
+            }
+            results[place_id] = details
+            self._memory.set(place_id, details, ttl=expires_at - now)
+        return results
+
+    def put_many(self, details_by_id: Dict[str, dict]):
+        """Store freshly fetched details, one row per requested field"""
+        now = time.time()
+        rows = []
+        for place_id, details in details_by_id.items():
+            hours = details.get("opening_hours")
+            if isinstance(hours, dict) and "open_now" in hours:
+                # open_now is only true at fetch time; keep the stable schedule
+                details = {**details, "opening_hours": {k: v for k, v in hours.items() if k != "open_now"}}
+            for field in FIELD_TTLS:
+                value = details.get(field)
+                rows.append((place_id, field, None if value is None else json.dumps(value), now))
+            self._memory.set(place_id, {k: v for k, v in details.items() if k in FIELD_TTLS and v is not None})
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO place_details (place_id, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
@@ -0,0 +1,42 @@
+from typing import Dict, List, Sequence
+import numpy as np
+from app.models import Location
+from app.geo import EARTH_RADIUS_KM
+
+
+def haversine_np(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Element-wise (broadcasting) great-circle distance in km; inputs in radians"""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class DistanceMatrix:
+    """
+    Distances from an origin to a set of points, and between every pair of
+    points, computed in one batch. Points are keyed by item_id and routes
+    are lists of item IDs.
+    """
+
+    def __init__(self, origin: Location, points: Dict[str, Location]):
+        self.index = {item_id: i for i, item_id in enumerate(points)}
+        coords = np.radians(np.array([(p.lat, p.lng) for p in points.values()], dtype=float).reshape(-1, 2))
+        lat, lng = coords[:, 0], coords[:, 1]
+        self.from_origin = haversine_np(np.radians(origin.lat), np.radians(origin.lng), lat, lng)
+        self.between = haversine_np(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+
+    def first_distances(self, routes: Sequence[List[str]]) -> np.ndarray:
+        """Distance from the origin to each route's first stop (inf for empty routes)"""
+        first = np.array([self.index[route[0]] if route else -1 for route in routes], dtype=int)
+        distances = np.full(len(routes), np.inf)
+        has_stops = first >= 0
+        distances[has_stops] = self.from_origin[first[has_stops]]
+        return distances
+
+    def route_legs(self, route: List[str]) -> List[float]:
+        """Per-stop leg lengths: origin to the first stop, then stop to stop"""
+        stops = [self.index[item_id] for item_id in route]
+        if not stops:
+            return []
+        legs = [self.from_origin[stops[0]]]
+        legs.extend(self.between[stops[:-1], stops[1:]])
+        return [float(leg) for leg in legs]
@@ -0,0 +1,94 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+from app.ttl_cache import TTLCache
+
+ENRICHMENT_CACHE_SIZE = int(os.getenv("ENRICHMENT_CACHE_SIZE", "10000"))
+ENRICHMENT_CACHE_TTL_SECONDS = float(os.getenv("ENRICHMENT_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+# Optional SQLite file for the persistent tier; leave unset to keep the cache in memory only
+ENRICHMENT_CACHE_DB_PATH = os.getenv("ENRICHMENT_CACHE_DB_PATH")
+
+
+def enrichment_key(prompt_version: str, item_id: Optional[str], name: str, description: str, context: str) -> str:
+    """Stable cache key for one enrichment prompt"""
+    identity = item_id or f"{name}\x1f{description}"
+    raw = f"{prompt_version}\x1f{identity}\x1f{context}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    Two-tier memo of Gemini enrichments: an in-process LRU in front of an
+    optional SQLite table, so an item is enriched once across requests and,
+    with the persistent tier enabled, across restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ENRICHMENT_CACHE_SIZE,
+        ttl: float = ENRICHMENT_CACHE_TTL_SECONDS,
+        db_path: Optional[str] = ENRICHMENT_CACHE_DB_PATH
+    ):
+        self.ttl = ttl
+        self._memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._conn = None
+        self._lock = threading.Lock()
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS enrichments (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Return cached enrichments for the keys that have one"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._memory.get(key)
+            if value is not None:
+                found[key] = copy.deepcopy(value)
+            else:
+                missing.append(key)
+
+        if missing and self._conn is not None:
+            cutoff = time.time() - self.ttl
+            with self._lock:
+                rows = []
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    rows.extend(self._conn.execute(
+                        f"SELECT key, value FROM enrichments WHERE created_at > ? AND key IN ({','.join('?' * len(chunk))})",
+                        [cutoff, *chunk]
+                    ))
+            for key, value in rows:
+                data = json.loads(value)
+                self._memory.set(key, data)
+                found[key] = copy.deepcopy(data)
+        return found
+
+    def set(self, key: str, value: Dict):
+        self.set_many({key: value})
+
+    def set_many(self, values: Dict[str, Dict]):
+        if not values:
+            return
+        for key, value in values.items():
+            self._memory.set(key, copy.deepcopy(value))
+        if self._conn is not None:
+            now = time.time()
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO enrichments (key, value, created_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), now) for key, value in values.items()]
+                )
+                self._conn.commit()
@@ -0,0 +1,25 @@
+import hashlib
+from typing import List, Optional
+from app.models import Quest
+
+
+def quest_etag(quests: List[Quest]) -> str:
+    """
+    Weak ETag over a quest list's content. created_at is left out since it
+    is stamped whenever a quest is built, not when its content changes.
+    """
+    digest = hashlib.sha1()
+    for quest in quests:
+        digest.update(quest.model_dump_json(exclude={"created_at"}).encode("utf-8"))
+        digest.update(b"\n")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, so W/ prefixes are ignored)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
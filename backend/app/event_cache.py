@@ -0,0 +1,180 @@
+import os
+import math
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.models import Event
+from app.geo import haversine_km
+from app.ttl_cache import TTLCache, FRESH
+
+EVENT_CACHE_TTL_SECONDS = float(os.getenv("EVENT_CACHE_TTL_SECONDS", "600"))
+# Stale entries are still served (and refreshed in the background) for this long
+EVENT_CACHE_STALE_SECONDS = float(os.getenv("EVENT_CACHE_STALE_SECONDS", "3600"))
+EVENT_CACHE_MAX_ENTRIES = int(os.getenv("EVENT_CACHE_MAX_ENTRIES", "2000"))
+# Lat/lng grid cell size used to share searches between nearby users (~2 km)
+EVENT_CACHE_CELL_DEGREES = float(os.getenv("EVENT_CACHE_CELL_DEGREES", "0.02"))
+# Cache fills fetch at least this many events so narrower queries can reuse them
+EVENT_CACHE_MIN_FETCH = int(os.getenv("EVENT_CACHE_MIN_FETCH", "50"))
+
+RADIUS_BUCKETS_KM = [5, 10, 25, 50, 100, 200]
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class EventFetchPlan:
+    """Upstream query that fills one cache entry"""
+
+    def __init__(self, cell: Tuple, lat: float, lng: float, radius: float,
+                 start_date: Optional[str], end_date: Optional[str], size: int):
+        self.cell = cell
+        self.lat = lat
+        self.lng = lng
+        self.radius = radius
+        self.start_date = start_date
+        self.end_date = end_date
+        self.size = size
+
+    @property
+    def key(self) -> Tuple:
+        return self.cell + (self.start_date, self.end_date)
+
+    @property
+    def fetch_key(self) -> Tuple:
+        """Identifies the upstream fetch; unlike the cache key, a different size is a different fetch"""
+        return self.key + (self.size,)
+
+
+class EventWindow:
+    """Events for one cell and date window, indexed by start time"""
+
+    def __init__(self, plan: EventFetchPlan, events: List[Event]):
+        self.plan = plan
+        timed = sorted((e for e in events if e.start_time), key=lambda e: e.start_time.timestamp())
+        self.events = timed
+        self.starts = [e.start_time.timestamp() for e in timed]
+        self.untimed = [e for e in events if not e.start_time]
+        self.start = _timestamp(plan.start_date, -math.inf)
+        end = _timestamp(plan.end_date, math.inf)
+        if len(events) >= plan.size and self.starts:
+            # Ticketmaster truncated the result, so only trust it up to the last event returned
+            end = min(end, self.starts[-1])
+        self.end = end
+
+    def covers(self, start: float, end: float, size: int) -> bool:
+        if start < self.start:
+            return False
+        if end <= self.end:
+            return True
+        # Results are date-ordered, so the first `size` events after start are enough
+        return len(self.starts) - bisect.bisect_left(self.starts, start) >= size
+
+    def slice(self, start: float, end: float) -> List[Event]:
+        lo = bisect.bisect_left(self.starts, start)
+        hi = bisect.bisect_right(self.starts, end)
+        return self.events[lo:hi] + self.untimed
+
+
+class EventCache:
+    """
+    Event searches cached by quantized location cell, radius bucket and date
+    window. A cached window answers any query for a narrower date range in
+    the same cell, and stale entries are served while they are refreshed.
+    """
+
+    def __init__(
+        self,
+        ttl: float = EVENT_CACHE_TTL_SECONDS,
+        stale_ttl: float = EVENT_CACHE_STALE_SECONDS,
+        max_entries: int = EVENT_CACHE_MAX_ENTRIES,
+        cell_degrees: float = EVENT_CACHE_CELL_DEGREES
+    ):
+        self.cell_degrees = cell_degrees
+        self._windows = TTLCache(max_entries=max_entries, ttl=ttl, stale_ttl=stale_ttl)
+        self._by_cell: Dict[Tuple, Set[Tuple]] = {}
+
+    def plan(self, lat: float, lng: float, radius: float,
+             start_date: Optional[str], end_date: Optional[str], size: int) -> EventFetchPlan:
+        """Quantize a query into the upstream search that would cache it"""
+        cell_lat = math.floor(lat / self.cell_degrees)
+        cell_lng = math.floor(lng / self.cell_degrees)
+        bucket = next((b for b in RADIUS_BUCKETS_KM if b >= radius), math.ceil(radius))
+        centre_lat = (cell_lat + 0.5) * self.cell_degrees
+        centre_lng = (cell_lng + 0.5) * self.cell_degrees
+        # Widen the search so it still reaches `bucket` km from any point in the cell
+        half_diagonal = haversine_km(centre_lat, centre_lng, cell_lat * self.cell_degrees, cell_lng * self.cell_degrees)
+        return EventFetchPlan(
+            cell=(cell_lat, cell_lng, bucket),
+            lat=round(centre_lat, 6),
+            lng=round(centre_lng, 6),
+            radius=math.ceil(bucket + half_diagonal),
+            start_date=_floor_day(start_date),
+            end_date=_ceil_day(end_date),
+            size=max(size, EVENT_CACHE_MIN_FETCH)
+        )
+
+    def lookup(self, lat: float, lng: float, radius: float, start_date: Optional[str],
+               end_date: Optional[str], size: int) -> Optional[Tuple[List[Event], str, EventFetchPlan]]:
+        """
+        Return (events, FRESH | STALE, plan of the window used) from a
+        covering window, or None on a miss
+        """
+        plan = self.plan(lat, lng, radius, start_date, end_date, size)
+        start = _timestamp(start_date, -math.inf)
+        end = _timestamp(end_date, math.inf)
+
+        best = None
+        for key in list(self._by_cell.get(plan.cell, ())):
+            window, state = self._windows.get_entry(key)
+            if window is None:
+                self._by_cell[plan.cell].discard(key)
+                continue
+            if window.covers(start, end, size) and (best is None or (state == FRESH and best[1] != FRESH)):
+                best = (window, state)
+        if best is None:
+            return None
+
+        window, state = best
+        return self.select(window, lat, lng, radius, start_date, end_date, size), state, window.plan
+
+    def select(self, window: EventWindow, lat: float, lng: float, radius: float,
+               start_date: Optional[str], end_date: Optional[str], size: int) -> List[Event]:
+        """Events of a window within the exact query radius and date range"""
+        events = [
+            e for e in window.slice(_timestamp(start_date, -math.inf), _timestamp(end_date, math.inf))
+            if not e.location or haversine_km(lat, lng, e.location.lat, e.location.lng) <= radius
+        ]
+        return events[:size]
+
+    def store(self, plan: EventFetchPlan, events: List[Event]) -> EventWindow:
+        window = EventWindow(plan, events)
+        self._windows.set(plan.key, window)
+        self._by_cell.setdefault(plan.cell, set()).add(plan.key)
+        return window
+
+
+def _timestamp(value: Optional[str], default: float) -> float:
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, DATE_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return default
+
+
+def _floor_day(value: Optional[str]) -> Optional[str]:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).strftime("%Y-%m-%dT00:00:00Z") if value else None
+    except ValueError:
+        return value
+
+
+def _ceil_day(value: Optional[str]) -> Optional[str]:
+    try:
+        parsed = datetime.strptime(value, DATE_FORMAT) if value else None
+    except ValueError:
+        return value
+    if parsed is None:
+        return None
+    if parsed.time() != datetime.min.time():
+        parsed = parsed + timedelta(days=1)
+    return parsed.strftime("%Y-%m-%dT00:00:00Z")
@@ -1,7 +1,11 @@
 import os
 import json
+import math
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from app.enrichment_cache import EnrichmentCache, enrichment_key
 
 load_dotenv()
 
@@ -22,9 +26,27 @@ except Exception as e:
     import logging
     logging.warning(f"Failed to import or configure Gemini: {e}. Gemini features will be disabled.")
 
+# Bump when the enrichment prompt (or what is accepted from it) changes so cached answers are not reused
+PROMPT_VERSION = "v2"
+
+DIFFICULTIES = ("low_energy", "medium_energy", "high_energy")
+
+# Maximum items sent to Gemini in one batched prompt
+ENRICHMENT_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "10"))
+
+# Async enrichment limits: concurrent model calls, per-call timeout, and the
+# overall budget after which unfinished items get fallback values
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_CALL_TIMEOUT_SECONDS = float(os.getenv("GEMINI_CALL_TIMEOUT_SECONDS", "8"))
+GEMINI_ENRICHMENT_BUDGET_SECONDS = float(os.getenv("GEMINI_ENRICHMENT_BUDGET_SECONDS", "10"))
+
 class GeminiService:
     def __init__(self):
         self.model = None
+        self.cache = EnrichmentCache()
+        # Async model calls run here; a call abandoned on timeout keeps its
+        # worker until it returns, so no more than GEMINI_MAX_CONCURRENCY run at once
+        self._executor = ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCY, thread_name_prefix="gemini")
         if genai and GOOGLE_API_KEY:
             try:
                 self.model = genai.GenerativeModel('gemini-1.5-flash')
@@ -35,15 +57,194 @@ class GeminiService:
         else:
             print("Warning: No Google API Key found for Gemini Service")
 
-    def enrich_quest_item(self, name: str, description: str, context: str = "") -> Dict:
+    def enrich_quest_item(self, name: str, description: str, context: str = "", item_id: Optional[str] = None) -> Dict:
         """
         Enrich a quest item (event or place) with estimated cost, duration, and categories
         using Gemini.
+        
+        Results are memoized by item identity (item_id, or name and
+        description) and prompt version; fallbacks are never cached.
         """
         if not self.model:
             return self._get_fallback_enrichment(name)
+        
+        key = enrichment_key(PROMPT_VERSION, item_id, name, description, context)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.model.generate_content(self._item_prompt(name, description, context))
+            data = self._parse_json(response.text)
+            enrichment = self._normalize_enrichment(data)
+            if enrichment is None:
+                raise ValueError(f"unexpected enrichment {data!r}")
+            self.cache.set(key, enrichment)
+            return enrichment
+        except Exception as e:
+            print(f"Error calling Gemini for {name}: {e}")
+            return self._get_fallback_enrichment(name)
+
+    def enrich_quest_items(self, items: List[Dict], batch_size: int = ENRICHMENT_BATCH_SIZE) -> List[Dict]:
+        """
+        Enrich many quest items with one prompt per batch of `batch_size`.
+        
+        Args:
+            items: Dicts with "name", "description" and optional "context"/"item_id"
+            batch_size: Maximum items per prompt
+        
+        Returns:
+            Enrichment dicts in the same order as `items`. Items missing from
+            a batch response are retried one at a time.
+        """
+        if not self.model:
+            return [self._get_fallback_enrichment(item["name"]) for item in items]
+
+        keys = [self._item_key(item) for item in items]
+        results = self.cache.get_many(keys)
+
+        # One prompt slot per distinct uncached item
+        pending = {}
+        for key, item in zip(keys, items):
+            if key not in results:
+                pending.setdefault(key, item)
+        pending_keys = list(pending)
+
+        for i in range(0, len(pending_keys), max(1, batch_size)):
+            chunk = {key: pending[key] for key in pending_keys[i:i + batch_size]}
+            enriched = self._enrich_batch(chunk)
+            self.cache.set_many(enriched)
+            results.update(enriched)
+            for key, item in chunk.items():
+                if key not in enriched:
+                    results[key] = self.enrich_quest_item(**item)
+
+        return [dict(results[key]) for key in keys]
+
+    async def enrich_quest_items_async(
+        self,
+        items: List[Dict],
+        batch_size: int = ENRICHMENT_BATCH_SIZE,
+        call_timeout: float = GEMINI_CALL_TIMEOUT_SECONDS,
+        budget: float = GEMINI_ENRICHMENT_BUDGET_SECONDS
+    ) -> List[Dict]:
+        """
+        Async enrich_quest_items with bounded latency.
+        
+        Batches (and their single-item retries) run concurrently, at most
+        GEMINI_MAX_CONCURRENCY model calls at a time across all requests
+        (including calls still running after their timeout), each limited to
+        `call_timeout` seconds. Items still unfinished after `budget`
+        seconds get fallback values.
+        """
+        if not self.model:
+            return [self._get_fallback_enrichment(item["name"]) for item in items]
+
+        keys = [self._item_key(item) for item in items]
+        results = self.cache.get_many(keys)
+        pending = {}
+        for key, item in zip(keys, items):
+            if key not in results:
+                pending.setdefault(key, item)
+        if pending:
+            semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+            async def run_single(key: str):
+                item = pending[key]
+                async with semaphore:
+                    try:
+                        response = await self._generate_async(
+                            self._item_prompt(item["name"], item["description"], item.get("context", "")), call_timeout
+                        )
+                        data = self._parse_json(response.text)
+                    except Exception as e:
+                        print(f"Error calling Gemini for {item['name']}: {e!r}")
+                        return
+                enrichment = self._normalize_enrichment(data)
+                if enrichment is not None:
+                    self.cache.set(key, enrichment)
+                    results[key] = enrichment
+
+            async def run_batch(chunk: Dict[str, Dict]):
+                if len(chunk) > 1:
+                    async with semaphore:
+                        try:
+                            response = await self._generate_async(
+                                self._batch_prompt(self._batch_ids(chunk), chunk), call_timeout
+                            )
+                            enriched = self._parse_batch(response.text, chunk)
+                        except Exception as e:
+                            print(f"Error calling Gemini for batch of {len(chunk)}: {e!r}")
+                            enriched = {}
+                    self.cache.set_many(enriched)
+                    results.update(enriched)
+                await asyncio.gather(*(run_single(key) for key in chunk if key not in results))
+
+            pending_keys = list(pending)
+            tasks = [
+                asyncio.ensure_future(run_batch({key: pending[key] for key in pending_keys[i:i + batch_size]}))
+                for i in range(0, len(pending_keys), max(1, batch_size))
+            ]
+            _, unfinished = await asyncio.wait(tasks, timeout=budget)
+            for task in unfinished:
+                task.cancel()
+            missed = sum(key not in results for key in pending)
+            if missed:
+                print(f"Gemini enrichment budget ({budget}s) exceeded; {missed} items use fallback values")
 
-        prompt = f"""
+        return [
+            dict(results[key]) if key in results else self._get_fallback_enrichment(item["name"])
+            for key, item in zip(keys, items)
+        ]
+
+    async def _generate_async(self, prompt: str, timeout: float):
+        """
+        Run the blocking SDK call in the Gemini pool with a timeout. The
+        timeout also covers waiting for a free worker; calls that time out
+        before starting are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._executor, self.model.generate_content, prompt), timeout)
+
+    def _enrich_batch(self, items: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Enrich a batch in one prompt; returns only the items that parsed cleanly"""
+        if len(items) == 1:
+            # Not worth the batch prompt; let the caller's per-item path handle it
+            return {}
+        try:
+            response = self.model.generate_content(self._batch_prompt(self._batch_ids(items), items))
+            return self._parse_batch(response.text, items)
+        except Exception as e:
+            print(f"Error calling Gemini for batch of {len(items)}: {e}")
+            return {}
+
+    def _batch_ids(self, items: Dict[str, Dict]) -> Dict[str, str]:
+        """Short prompt ids -> cache keys"""
+        return {str(n): key for n, key in enumerate(items, start=1)}
+
+    def _parse_batch(self, text: str, items: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Map a batch reply back to cache keys, skipping entries that don't validate"""
+        ids = self._batch_ids(items)
+        data = self._parse_json(text)
+        enriched = {}
+        for entry in data if isinstance(data, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            key = ids.get(str(entry.get("id", "")))
+            enrichment = self._normalize_enrichment(entry)
+            if key and enrichment is not None:
+                enriched[key] = enrichment
+        if len(enriched) < len(items):
+            print(f"Gemini batch: {len(items) - len(enriched)} of {len(items)} items need a single-item retry")
+        return enriched
+
+    def _item_key(self, item: Dict) -> str:
+        return enrichment_key(
+            PROMPT_VERSION, item.get("item_id"), item["name"], item["description"], item.get("context", "")
+        )
+
+    def _item_prompt(self, name: str, description: str, context: str) -> str:
+        return f"""
         Analyze the following event or place and provide estimated details in JSON format.
         
         Item Name: {name}
@@ -65,20 +266,75 @@ class GeminiService:
         }}
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            text = response.text
-            # Clean up potential markdown code blocks
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0]
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0]
-            
-            data = json.loads(text.strip())
-            return data
-        except Exception as e:
-            print(f"Error calling Gemini for {name}: {e}")
-            return self._get_fallback_enrichment(name)
+    def _batch_prompt(self, ids: Dict[str, str], items: Dict[str, Dict]) -> str:
+        listing = json.dumps([
+            {
+                "id": item_id,
+                "name": items[key]["name"],
+                "description": items[key]["description"],
+                "context": items[key].get("context", "")
+            }
+            for item_id, key in ids.items()
+        ], indent=2)
+        return f"""
+        Analyze each of the following events or places and provide estimated details in JSON format.
+        
+        Items:
+        {listing}
+        
+        Return ONLY a raw JSON array (no markdown formatting) with one object per item, in any order,
+        each with the following integer/string fields:
+        - id: the item's id, copied exactly
+        - estimated_cost: estimated cost per person in CAD (integer)
+        - estimated_time: estimated duration in minutes (integer)
+        - categories: list of 3-5 relevant categories (strings, lowercase)
+        - difficulty: "low_energy", "medium_energy", or "high_energy"
+        
+        Example JSON:
+        [
+            {{
+                "id": "1",
+                "estimated_cost": 25,
+                "estimated_time": 90,
+                "categories": ["food", "social", "nightlife"],
+                "difficulty": "medium_energy"
+            }}
+        ]
+        """
+
+    def _parse_json(self, text: str):
+        """Parse a JSON reply, tolerating markdown code fences"""
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0]
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0]
+        return json.loads(text.strip())
+
+    def _normalize_enrichment(self, data) -> Optional[Dict]:
+        """
+        A reply coerced to what the quest builders accept, or None if it
+        can't be used. Only normalized replies are cached.
+        """
+        if not isinstance(data, dict):
+            return None
+        cost = data.get("estimated_cost")
+        minutes = data.get("estimated_time")
+        for value in (cost, minutes):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+                return None
+        categories = data.get("categories")
+        if not isinstance(categories, list) or not categories:
+            return None
+        if not all(isinstance(c, str) and c.strip() for c in categories):
+            return None
+        if data.get("difficulty") not in DIFFICULTIES:
+            return None
+        return {
+            "estimated_cost": cost,
+            "estimated_time": int(round(minutes)),
+            "categories": [c.strip() for c in categories],
+            "difficulty": data["difficulty"]
+        }
 
     def _get_fallback_enrichment(self, name: str) -> Dict:
         """Return safe fallback defaults if Gemini fails"""
@@ -0,0 +1,69 @@
+import os
+import uuid
+import asyncio
+from typing import Dict, List, Optional
+from app.models import Quest, QuestGeneration
+from app.ttl_cache import TTLCache
+
+# How long a deferred generation can be polled after it was created
+GENERATION_TTL_SECONDS = float(os.getenv("GENERATION_TTL_SECONDS", "900"))
+GENERATION_MAX_JOBS = int(os.getenv("GENERATION_MAX_JOBS", "1000"))
+
+STATUS_PENDING = "pending"
+STATUS_COMPLETE = "complete"
+
+
+class GenerationJob:
+    """Quests returned early by a deferred generation, updated as enrichment lands"""
+
+    def __init__(self, quests: List[Quest]):
+        self.generation_id = str(uuid.uuid4())
+        self.status = STATUS_PENDING
+        self.quests: Dict[str, Quest] = {q.quest_id: q for q in quests}
+        self.updates: List[Quest] = []  # updated quests, in the order they changed
+        self._changed = asyncio.Event()
+
+    def update(self, quests: List[Quest]):
+        for quest in quests:
+            self.quests[quest.quest_id] = quest
+            self.updates.append(quest)
+        self._notify()
+
+    def complete(self):
+        self.status = STATUS_COMPLETE
+        self._notify()
+
+    def snapshot(self) -> QuestGeneration:
+        return QuestGeneration(
+            generation_id=self.generation_id,
+            status=self.status,
+            quests=list(self.quests.values())
+        )
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        if self.status == STATUS_COMPLETE:
+            return False
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class GenerationStore:
+    """In-memory registry of deferred generations, keyed by generation_id"""
+
+    def __init__(self, ttl: float = GENERATION_TTL_SECONDS, max_jobs: int = GENERATION_MAX_JOBS):
+        self._jobs = TTLCache(max_entries=max_jobs, ttl=ttl)
+
+    def create(self, quests: List[Quest]) -> GenerationJob:
+        job = GenerationJob(quests)
+        self._jobs.set(job.generation_id, job)
+        return job
+
+    def get(self, generation_id: str) -> Optional[GenerationJob]:
+        return self._jobs.get(generation_id)
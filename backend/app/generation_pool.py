@@ -0,0 +1,159 @@
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.models import Event, Location, Place, Quest
+from app.quest_generator import QuestGenerator, MAX_QUEST_RESULTS, QUEST_FAMILIES
+from app.quest_candidates import RankedCandidates
+
+# "thread" keeps workers in-process; "process" sidesteps the GIL at the cost of pickling inputs
+QUEST_WORKER_MODE = os.getenv("QUEST_WORKER_MODE", "thread")
+QUEST_WORKER_POOL_SIZE = int(os.getenv("QUEST_WORKER_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# Generations allowed to wait for a worker before new requests are turned away
+QUEST_WORKER_QUEUE_DEPTH = int(os.getenv("QUEST_WORKER_QUEUE_DEPTH", "32"))
+# Requests with at least this many places + events run each template family in its own worker
+QUEST_SPLIT_THRESHOLD = int(os.getenv("QUEST_SPLIT_THRESHOLD", "60"))
+
+_generator: Optional[QuestGenerator] = None
+
+
+def _get_generator() -> QuestGenerator:
+    global _generator
+    if _generator is None:
+        _generator = QuestGenerator()
+    return _generator
+
+
+def _generate_ranked(
+    places: List[Place],
+    events: List[Event],
+    user_location: Location,
+    preferences: dict,
+    enrichments: Dict[str, dict],
+    families: Tuple[str, ...]
+) -> List[Tuple[float, Quest]]:
+    """Worker entry point; module-level so process pools can pickle it"""
+    return _get_generator().generate_ranked(places, events, user_location, preferences, enrichments, families)
+
+
+def _rank_candidates(
+    places: List[Place],
+    events: List[Event],
+    user_location: Location,
+    preferences: dict,
+    enrichments: Dict[str, dict],
+    limit: int
+) -> RankedCandidates:
+    """Worker entry point for paginated generations"""
+    return _get_generator().rank_candidates(
+        places, events, user_location, preferences, enrichments, limit=limit
+    )
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the queue is full"""
+
+
+class GenerationPool:
+    """
+    Runs quest generation off the event loop in a thread or process pool,
+    rejecting work beyond pool size + queue depth instead of queueing it
+    without bound.
+    """
+
+    def __init__(
+        self,
+        mode: str = QUEST_WORKER_MODE,
+        size: int = QUEST_WORKER_POOL_SIZE,
+        queue_depth: int = QUEST_WORKER_QUEUE_DEPTH,
+        split_threshold: int = QUEST_SPLIT_THRESHOLD
+    ):
+        self.mode = mode
+        self.size = max(1, size)
+        self.queue_depth = queue_depth
+        self.split_threshold = split_threshold
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    async def generate(
+        self,
+        places: List[Place],
+        events: List[Event],
+        user_location: Location,
+        preferences: dict,
+        enrichments: Optional[Dict[str, dict]] = None,
+        families: Tuple[str, ...] = QUEST_FAMILIES
+    ) -> List[Quest]:
+        """
+        QuestGenerator.generate_quests in the pool, limited to `families`;
+        raises PoolSaturated when full
+        """
+        self._check_capacity()
+
+        if families != QUEST_FAMILIES:
+            groups = [families]
+        elif places and events and len(places) + len(events) >= self.split_threshold:
+            groups = [(family,) for family in QUEST_FAMILIES]
+        else:
+            groups = [QUEST_FAMILIES]
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            runs = await asyncio.gather(*(
+                loop.run_in_executor(
+                    self._get_executor(), _generate_ranked,
+                    places, events, user_location, preferences, enrichments or {}, families
+                )
+                for families in groups
+            ))
+        finally:
+            self._pending -= 1
+
+        if len(runs) == 1:
+            return [quest for _, quest in runs[0]]
+        return QuestGenerator.merge_ranked(runs)
+
+    async def rank(
+        self,
+        places: List[Place],
+        events: List[Event],
+        user_location: Location,
+        preferences: dict,
+        enrichments: Optional[Dict[str, dict]] = None,
+        limit: int = MAX_QUEST_RESULTS
+    ) -> RankedCandidates:
+        """
+        QuestGenerator.rank_candidates in the pool, for paginated requests.
+        Runs as one job: ranked sets from separate families can't be merged
+        without building them. Raises PoolSaturated when full.
+        """
+        self._check_capacity()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _rank_candidates,
+                places, events, user_location, preferences, enrichments or {}, limit
+            )
+        finally:
+            self._pending -= 1
+
+    def _check_capacity(self):
+        if self._pending >= self.size + self.queue_depth:
+            raise PoolSaturated()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="quest-gen")
+        return self._executor
+
+
+generation_pool = GenerationPool()
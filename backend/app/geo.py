@@ -0,0 +1,86 @@
+import math
+from typing import Iterator, Tuple
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometers"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """Encode a point as a geohash string of the given length"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(lat_degrees, lng_degrees) spanned by one geohash cell"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def precision_for_radius(radius_km: float, lat: float = 0.0, min_precision: int = 3, max_precision: int = 7) -> int:
+    """Coarsest geohash precision whose cells are at most half the radius wide"""
+    for precision in range(min_precision, max_precision + 1):
+        lat_deg, lng_deg = geohash_cell_size(precision)
+        width_km = max(lat_deg * KM_PER_DEGREE_LAT, lng_deg * KM_PER_DEGREE_LAT * math.cos(math.radians(lat)))
+        if width_km <= radius_km / 2:
+            return precision
+    return max_precision
+
+
+def covering_cells(lat: float, lng: float, radius_km: float, precision: int) -> Iterator[Tuple[str, bool]]:
+    """
+    Yield (geohash, centre_inside) for every cell that intersects the circle.
+
+    centre_inside is True when the cell's centre lies within the circle,
+    i.e. the circle covers most of the cell.
+    """
+    lat_deg, lng_deg = geohash_cell_size(precision)
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+
+    lat0 = math.floor((lat - dlat + 90) / lat_deg) * lat_deg - 90
+    lng0 = math.floor((lng - dlng + 180) / lng_deg) * lng_deg - 180
+    cell_lat = lat0
+    while cell_lat < lat + dlat:
+        cell_lng = lng0
+        while cell_lng < lng + dlng:
+            # Nearest point of the cell to the centre decides intersection
+            near_lat = min(max(lat, cell_lat), cell_lat + lat_deg)
+            near_lng = min(max(lng, cell_lng), cell_lng + lng_deg)
+            if haversine_km(lat, lng, near_lat, near_lng) <= radius_km:
+                centre_lat = cell_lat + lat_deg / 2
+                centre_lng = cell_lng + lng_deg / 2
+                centre_inside = haversine_km(lat, lng, centre_lat, centre_lng) <= radius_km
+                yield geohash_encode(centre_lat, centre_lng, precision), centre_inside
+            cell_lng += lng_deg
+        cell_lat += lat_deg
@@ -1,7 +1,81 @@
 import os
-import requests
-from typing import List, Optional
+import math
+import time
+import asyncio
+import httpx
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from app.models import Place, Location
+from app.http_client import get_async_client, make_timeout, run_sync
+from app.place_cache import PlaceCache
+from app.details_store import FIELD_TTLS, PlaceDetailsStore
+from app.single_flight import SingleFlight
+
+MAX_PAGES = 3  # Google returns at most 3 pages (60 results total)
+MAX_SEARCH_RESULTS = 60
+PAGE_TOKEN_DELAY_SECONDS = 2  # Google requires a short delay before a page token is valid
+
+# How long a request may wait for pages 2-3 before returning what it has.
+# 0 means "page 1 only"; the remaining pages still arrive in the background.
+PAGE_BUDGET_SECONDS = float(os.getenv("PLACES_PAGE_BUDGET_SECONDS", "0"))
+
+# Maximum concurrent Place Details requests for one batch lookup
+DETAILS_FETCH_CONCURRENCY = int(os.getenv("PLACE_DETAILS_CONCURRENCY", "10"))
+
+# How long pages fetched in the background are kept for the next identical search
+CONTINUATION_TTL_SECONDS = float(os.getenv("PLACES_CONTINUATION_TTL_SECONDS", "120"))
+
+
+class PlacesSearch:
+    """
+    Pages of one nearby search. Pages are appended by a background task as
+    they arrive, so callers can return early and later requests for the same
+    search pick up whatever has been fetched since.
+    """
+    
+    def __init__(self):
+        self.places: List[Place] = []
+        self.pages = 0
+        self.complete = False
+        self.failed = False
+        self.task: Optional[asyncio.Task] = None
+        self.loop = asyncio.get_running_loop()
+        self.created_at = time.monotonic()
+        self._changed = asyncio.Event()
+    
+    def add_page(self, places: List[Place]):
+        self.places.extend(places)
+        self.pages += 1
+        self._notify()
+    
+    def finish(self, failed: bool = False):
+        self.complete = True
+        self.failed = failed
+        self._notify()
+    
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+    
+    async def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Wait until another page arrives or the search completes"""
+        if self.complete:
+            return False
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def wait(self, budget: float):
+        """Wait for page 1, then for more pages until done or the budget runs out"""
+        while self.pages == 0 and not self.complete:
+            await self.wait_for_change()
+        deadline = time.monotonic() + budget
+        while not self.complete:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.wait_for_change(None if math.isinf(remaining) else remaining):
+                break
+
 
 class GooglePlacesAPI:
     """Integration with Google Places API"""
@@ -9,8 +83,25 @@ class GooglePlacesAPI:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         self.base_url = "https://maps.googleapis.com/maps/api/place"
+        self._searches: Dict[Tuple, PlacesSearch] = {}
+        self.cache = PlaceCache()
+        self._details_store: Optional[PlaceDetailsStore] = None
+        self._details_inflight = SingleFlight()
+    
+    def nearby_search(self, lat: float, lng: float, radius: float, place_type: str = None, keyword: str = None, timeout: Optional[float] = None) -> List[Place]:
+        """Blocking wrapper around nearby_search_async; waits for every page"""
+        return run_sync(self.nearby_search_async(lat, lng, radius, place_type, keyword, timeout=timeout, page_budget=math.inf))
     
-    def nearby_search(self, lat: float, lng: float, radius: float, place_type: str = None, keyword: str = None) -> List[Place]:
+    async def nearby_search_async(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        place_type: str = None,
+        keyword: str = None,
+        timeout: Optional[float] = None,
+        page_budget: Optional[float] = None
+    ) -> List[Place]:
         """
         Search for nearby places using Google Places API
         
@@ -20,14 +111,109 @@ class GooglePlacesAPI:
             radius: Search radius in kilometers
             place_type: Type of place to search for
             keyword: Keyword to search for
+            timeout: Per-request timeout in seconds (defaults to UPSTREAM_TIMEOUT_SECONDS)
+            page_budget: Seconds to wait for pages after the first
+                (defaults to PLACES_PAGE_BUDGET_SECONDS)
             
         Returns:
             List of Place objects
         """
+        search = self.start_nearby_search(lat, lng, radius, place_type, keyword, timeout)
+        await search.wait(PAGE_BUDGET_SECONDS if page_budget is None else page_budget)
+        if not search.complete:
+            print(f"  Returning {len(search.places)} places from {search.pages} page(s); more pages loading in background")
+        return list(search.places)
+    
+    async def iter_nearby_pages(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        place_type: str = None,
+        keyword: str = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[List[Place]]:
+        """Yield places page by page as they arrive, starting with page 1"""
+        search = self.start_nearby_search(lat, lng, radius, place_type, keyword, timeout)
+        sent = 0
+        while True:
+            if len(search.places) > sent:
+                batch = search.places[sent:]
+                sent += len(batch)
+                yield batch
+            if search.complete:
+                break
+            await search.wait_for_change()
+    
+    def start_nearby_search(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        place_type: str = None,
+        keyword: str = None,
+        timeout: Optional[float] = None
+    ) -> PlacesSearch:
+        """
+        Return the in-progress or recently finished search for these
+        parameters, starting a new background fetch if there is none.
+        
+        Concurrent identical searches share one upstream fetch.
+        """
+        self._prune_searches()
+        loop = asyncio.get_running_loop()
+        key = self._search_key(lat, lng, radius, place_type, keyword)
+        search = self._searches.get(key)
+        if search and search.loop is loop and not search.failed:
+            return search
+        
+        search = PlacesSearch()
+        cached = self.cache.lookup(lat, lng, radius, place_type, keyword)
+        if cached is not None:
+            search.add_page(cached)
+            search.finish()
+            return search
+        
         if not self.api_key:
             print("ERROR: GOOGLE_MAPS_API_KEY not found in environment variables!")
-            return []
-            
+            search.finish(failed=True)
+            return search
+        
+        search.task = loop.create_task(self._fetch_pages(search, lat, lng, radius, place_type, keyword, timeout))
+        self._searches[key] = search
+        return search
+    
+    def _search_key(self, lat: float, lng: float, radius: float, place_type: str = None, keyword: str = None) -> Tuple:
+        """Normalize search parameters (coordinates to ~1 m) so equivalent searches coalesce"""
+        return (
+            round(lat, 5),
+            round(lng, 5),
+            round(min(radius * 1000, 50000)),
+            (place_type or "").strip().lower(),
+            (keyword or "").strip().lower()
+        )
+    
+    def _prune_searches(self):
+        """Drop finished searches older than the continuation TTL"""
+        now = time.monotonic()
+        expired = [
+            key for key, search in self._searches.items()
+            if search.failed or (search.complete and now - search.created_at > CONTINUATION_TTL_SECONDS)
+        ]
+        for key in expired:
+            del self._searches[key]
+    
+    async def _fetch_pages(
+        self,
+        search: PlacesSearch,
+        lat: float,
+        lng: float,
+        radius: float,
+        place_type: str = None,
+        keyword: str = None,
+        timeout: Optional[float] = None
+    ):
+        """Fetch up to MAX_PAGES pages into the search object"""
         url = f"{self.base_url}/nearbysearch/json"
         
         params = {
@@ -45,50 +231,54 @@ class GooglePlacesAPI:
         print(f"  Location: {params['location']}")
         print(f"  Radius: {params['radius']} meters")
         
-        places = []
-        max_pages = 3  # Fetch up to 3 pages (60 results total)
-        page_count = 0
+        client = get_async_client()
         next_page_token = None
+        exhaustive = False  # every page loaded and Google had no more to give
         
         try:
-            while page_count < max_pages:
+            while search.pages < MAX_PAGES:
                 # Add page token if we have one
                 if next_page_token:
                     params['pagetoken'] = next_page_token
-                    # Google requires a short delay before using page token
-                    import time
-                    time.sleep(2)
+                    await asyncio.sleep(PAGE_TOKEN_DELAY_SECONDS)
                 
-                response = requests.get(url, params=params)
+                response = await client.get(url, params=params, timeout=make_timeout(timeout))
                 response.raise_for_status()
                 data = response.json()
                 
-                print(f"Google Places API Response Status (page {page_count + 1}): {data.get('status')}")
+                print(f"Google Places API Response Status (page {search.pages + 1}): {data.get('status')}")
                 if data.get('status') != 'OK' and data.get('status') != 'ZERO_RESULTS':
                     print(f"Google Places API Error: {data.get('error_message', 'Unknown error')}")
                     print(f"Full response: {data}")
                     break
                 
                 # Parse results from this page
+                places = []
                 for result in data.get("results", []):
                     place = self._parse_place(result)
                     if place:
                         places.append(place)
+                search.add_page(places)
                 
                 # Check if there's a next page
                 next_page_token = data.get('next_page_token')
-                page_count += 1
-                
                 if not next_page_token:
-                    print(f"  No more pages available (fetched {page_count} pages)")
+                    print(f"  No more pages available (fetched {search.pages} pages)")
+                    exhaustive = True
                     break
             
-            print(f"Total places fetched: {len(places)} from {page_count} pages")
-            return places
+            print(f"Total places fetched: {len(search.places)} from {search.pages} pages")
         
-        except requests.RequestException as e:
-            print(f"Error fetching places: {e}")
-            return []
+        except Exception as e:
+            # Bad bodies (e.g. non-JSON) as well as transport errors; waiters must never hang
+            print(f"Error fetching places: {e!r}")
+        finally:
+            search.finish(failed=search.pages == 0)
+            if search.pages:
+                # A full 60 results is Google's cap, a prominence-ranked sample rather
+                # than every place in the circle, so only shorter searches cover their tiles
+                complete = exhaustive and len(search.places) < MAX_SEARCH_RESULTS
+                self.cache.store(lat, lng, radius, search.places, place_type, keyword, complete=complete)
     
     def _parse_place(self, result: dict) -> Optional[Place]:
         """Parse Google Places API result into Place model"""
@@ -120,19 +310,71 @@ class GooglePlacesAPI:
             print(f"Error parsing place: {e}")
             return None
     
-    def get_place_details(self, place_id: str) -> Optional[dict]:
+    def get_place_details(self, place_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Blocking wrapper around get_place_details_async for synchronous callers"""
+        return run_sync(self.get_place_details_async(place_id, timeout=timeout))
+    
+    def get_place_details_batch(self, place_ids: List[str], timeout: Optional[float] = None) -> Dict[str, dict]:
+        """Blocking wrapper around get_place_details_batch_async for synchronous callers"""
+        return run_sync(self.get_place_details_batch_async(place_ids, timeout=timeout))
+    
+    async def get_place_details_async(self, place_id: str, timeout: Optional[float] = None) -> Optional[dict]:
         """Get detailed information about a specific place"""
+        details = await self.get_place_details_batch_async([place_id], timeout=timeout)
+        return details.get(place_id)
+    
+    async def get_place_details_batch_async(self, place_ids: List[str], timeout: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Get details for many places at once
+        
+        Fresh entries come from the on-disk store; misses are fetched
+        concurrently and written back.
+        
+        Returns:
+            Dict of place_id -> details (places that failed to load are omitted)
+        """
+        store = self._get_details_store()
+        results = store.get_many(place_ids)
+        misses = [place_id for place_id in dict.fromkeys(place_ids) if place_id not in results]
+        if not misses:
+            return results
+        
+        semaphore = asyncio.Semaphore(DETAILS_FETCH_CONCURRENCY)
+        
+        async def fetch(place_id: str):
+            async with semaphore:
+                return place_id, await self._details_inflight.do(
+                    place_id, lambda: self._fetch_place_details(place_id, timeout)
+                )
+        
+        fetched = {
+            place_id: details
+            for place_id, details in await asyncio.gather(*(fetch(place_id) for place_id in misses))
+            if details is not None
+        }
+        if fetched:
+            store.put_many(fetched)
+        results.update(fetched)
+        return results
+    
+    def _get_details_store(self) -> PlaceDetailsStore:
+        if self._details_store is None:
+            self._details_store = PlaceDetailsStore()
+        return self._details_store
+    
+    async def _fetch_place_details(self, place_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Fetch one place's details from the Place Details API"""
         url = f"{self.base_url}/details/json"
         params = {
             "place_id": place_id,
-            "fields": "name,rating,formatted_phone_number,opening_hours,website,price_level,photos",
+            "fields": ",".join(FIELD_TTLS),
             "key": self.api_key
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = await get_async_client().get(url, params=params, timeout=make_timeout(timeout))
             response.raise_for_status()
             return response.json().get("result")
-        except requests.RequestException as e:
-            print(f"Error fetching place details: {e}")
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error fetching place details: {e!r}")
             return None
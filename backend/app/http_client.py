@@ -0,0 +1,70 @@
+import os
+import asyncio
+import threading
+from typing import Awaitable, Dict, Optional, TypeVar
+import httpx
+
+T = TypeVar("T")
+
+# Upstream timeouts (seconds) - override per call with the `timeout` argument
+DEFAULT_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "5"))
+
+# Connection pool sizing shared by every upstream client
+MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_lock = threading.Lock()
+
+
+def make_timeout(timeout: Optional[float] = None) -> httpx.Timeout:
+    """Build an httpx timeout, using the configured defaults when not given"""
+    total = DEFAULT_TIMEOUT if timeout is None else timeout
+    return httpx.Timeout(total, connect=min(CONNECT_TIMEOUT, total))
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled AsyncClient for the running event loop.
+
+    httpx clients are bound to the loop that opened their connections, so
+    one keep-alive pool is kept per loop (normally just the uvicorn loop).
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=make_timeout(),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_clients():
+    """Close the pooled client owned by the running loop (call on shutdown)"""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine from synchronous code.
+
+    Sync callers share one background event loop, so they also share one
+    connection pool instead of opening a new one per call.
+    """
+    global _sync_loop
+    with _sync_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_sync_loop.run_forever, name="upstream-sync-loop", daemon=True)
+            thread.start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
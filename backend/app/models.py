@@ -54,6 +54,7 @@ class QuestStep(BaseModel):
     estimated_time: Optional[int] = None  # minutes
     location: Location
     photo_url: Optional[str] = None  # URL to place/event photo
+    leg_distance: Optional[float] = None  # km from the previous step (from the user for the first step)
 
 class Quest(BaseModel):
     quest_id: str
@@ -94,12 +95,21 @@ class NearbyEventsRequest(BaseModel):
     radius_km: float = 25.0
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    size: int = 20
 
 class GenerateQuestsRequest(BaseModel):
     location: Location
     radius_km: float = 50.0
     categories: Optional[List[str]] = None
     preferences: Optional[dict] = None
+    defer_enrichment: bool = False  # return fallback estimates now, enrich in the background
+    limit: Optional[int] = None  # page size; set limit or cursor to paginate
+    cursor: Optional[str] = None  # X-Next-Cursor from the previous page
+
+class QuestGeneration(BaseModel):
+    generation_id: str
+    status: str  # pending, complete
+    quests: List[Quest]
 
 class FriendRequest(BaseModel):
     request_id: Optional[str] = None
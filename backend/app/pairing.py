@@ -0,0 +1,30 @@
+import heapq
+from typing import Iterator, Sequence, Tuple
+
+
+def best_pairs(first: Sequence[float], second: Sequence[float], same: bool = False) -> Iterator[Tuple[int, int]]:
+    """
+    Yield index pairs (i, j) in descending order of first[i] + second[j]
+    without materialising the cross product.
+
+    Both score lists must already be sorted in descending order. Pairs are
+    expanded from a frontier heap, so taking the best k costs O(k log k).
+    With same=True the lists are the same items and only pairs with i < j
+    are yielded.
+    """
+    if not first or not second:
+        return
+    start = (0, 1) if same else (0, 0)
+    if start[1] >= len(second):
+        return
+
+    heap = [(-(first[start[0]] + second[start[1]]), start)]
+    seen = {start}
+    while heap:
+        _, (i, j) = heapq.heappop(heap)
+        yield i, j
+        for ni, nj in ((i + 1, j), (i, j + 1)):
+            if ni >= len(first) or nj >= len(second) or (same and ni >= nj) or (ni, nj) in seen:
+                continue
+            seen.add((ni, nj))
+            heapq.heappush(heap, (-(first[ni] + second[nj]), (ni, nj)))
@@ -0,0 +1,105 @@
+import os
+from typing import Dict, List, Optional
+from app.models import Place
+from app.geo import covering_cells, geohash_encode, haversine_km, precision_for_radius
+from app.ttl_cache import TTLCache
+
+PLACE_CACHE_TTL_SECONDS = float(os.getenv("PLACE_CACHE_TTL_SECONDS", "1800"))
+PLACE_CACHE_MAX_TILES = int(os.getenv("PLACE_CACHE_MAX_TILES", "20000"))
+# Share of a query's tiles that must have been fully searched before it counts as a hit
+PLACE_CACHE_MIN_COVERAGE = float(os.getenv("PLACE_CACHE_MIN_COVERAGE", "0.9"))
+
+
+class PlaceTile:
+    """Places that fall inside one geohash cell for one place type/keyword"""
+
+    def __init__(self):
+        self.places: Dict[str, Place] = {}
+        self.complete = False  # a stored search covered most of the cell
+
+
+class PlaceCache:
+    """
+    Nearby-search results indexed by geohash tile and place type.
+
+    The tile precision follows the search radius, so a query is answered
+    from earlier searches at a similar scale that covered the same cells,
+    even when they were centred somewhere else.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PLACE_CACHE_TTL_SECONDS,
+        max_tiles: int = PLACE_CACHE_MAX_TILES,
+        min_coverage: float = PLACE_CACHE_MIN_COVERAGE
+    ):
+        self.min_coverage = min_coverage
+        self._tiles = TTLCache(max_entries=max_tiles, ttl=ttl)
+
+    def lookup(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        place_type: str = None,
+        keyword: str = None
+    ) -> Optional[List[Place]]:
+        """Return cached places within radius km, or None if the area is not covered"""
+        precision = precision_for_radius(radius, lat)
+        type_key = self._type_key(place_type, keyword)
+        tiles = []
+        complete = 0
+        total = 0
+        for geohash, centre_inside in covering_cells(lat, lng, radius, precision):
+            tile = self._tiles.get((geohash, type_key))
+            if tile:
+                tiles.append(tile)
+            if centre_inside:
+                total += 1
+                complete += bool(tile and tile.complete)
+        if not total or complete / total < self.min_coverage:
+            return None
+
+        found = []
+        for tile in tiles:
+            for place in tile.places.values():
+                distance = haversine_km(lat, lng, place.location.lat, place.location.lng)
+                if distance <= radius:
+                    found.append((distance, place))
+        found.sort(key=lambda item: item[0])
+        print(f"Place cache hit: {len(found)} places from {complete}/{total} tiles")
+        return [place for _, place in found]
+
+    def store(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        places: List[Place],
+        place_type: str = None,
+        keyword: str = None,
+        complete: bool = True
+    ):
+        """
+        Index the results of a finished search by tile. Only a complete
+        search (every place in the circle) marks the tiles it covers as
+        searched; others just add their places.
+        """
+        precision = precision_for_radius(radius, lat)
+        type_key = self._type_key(place_type, keyword)
+
+        by_tile: Dict[str, List[Place]] = {}
+        for place in places:
+            if place.location:
+                by_tile.setdefault(geohash_encode(place.location.lat, place.location.lng, precision), []).append(place)
+
+        for geohash, centre_inside in covering_cells(lat, lng, radius, precision):
+            key = (geohash, type_key)
+            tile = self._tiles.get(key) or PlaceTile()
+            tile.complete = tile.complete or (complete and centre_inside)
+            for place in by_tile.get(geohash, []):
+                tile.places[place.place_id] = place
+            self._tiles.set(key, tile)
+
+    def _type_key(self, place_type: str = None, keyword: str = None) -> tuple:
+        return ((place_type or "").strip().lower(), (keyword or "").strip().lower())
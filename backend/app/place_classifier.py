@@ -0,0 +1,143 @@
+import os
+import math
+from enum import IntFlag
+from functools import lru_cache
+from typing import List, NamedTuple
+from app.models import Place
+from app.ttl_cache import TTLCache
+
+PLACE_CLASSIFIER_CACHE_SIZE = int(os.getenv("PLACE_CLASSIFIER_CACHE_SIZE", "50000"))
+
+
+class Role(IntFlag):
+    """Quest roles a place can fill"""
+    NONE = 0
+    CAFE = 1
+    PARK = 2
+    RESTAURANT = 4
+    BAR = 8
+    SHOP = 16
+    DINING = 32  # pre-event dinner spot: restaurant, bar or cafe
+
+
+# Keywords are matched as substrings of each Google type
+ROLE_KEYWORDS = {
+    Role.CAFE: ['cafe', 'coffee'],
+    Role.PARK: ['park', 'outdoor'],
+    Role.RESTAURANT: ['restaurant', 'food'],
+    Role.BAR: ['bar', 'night_club'],
+    Role.SHOP: ['store', 'shop', 'shopping'],
+    Role.DINING: ['restaurant', 'bar', 'cafe'],
+}
+
+# Strict exclusions - definitely not interesting for quests
+EXCLUDE_KEYWORDS = [
+    'gas_station', 'parking', 'atm',
+    'car_wash', 'car_repair', 'storage', 'laundry', 'locksmith',
+    'plumber', 'electrician', 'lawyer', 'insurance', 'real_estate',
+    'dentist', 'doctor', 'hospital', 'pharmacy', 'veterinary',
+    'funeral', 'cemetery',
+    'post_office', 'courthouse', 'embassy',
+]
+
+# Always include these - definitely interesting
+INCLUDE_KEYWORDS = [
+    'restaurant', 'cafe', 'bar', 'night_club', 'food', 'bakery',
+    'meal_delivery', 'meal_takeaway', 'pizza',
+    'museum', 'art_gallery', 'library', 'aquarium', 'zoo',
+    'park', 'amusement_park', 'bowling_alley', 'movie_theater',
+    'stadium', 'casino', 'spa', 'gym', 'tourist_attraction',
+    'shopping_mall', 'department_store', 'clothing_store',
+    'book_store', 'jewelry_store', 'shoe_store', 'beauty_salon',
+]
+
+# Stores that are errands rather than outings (checked in the name too)
+UTILITY_KEYWORDS = ['ups', 'fedex', 'postal', 'hardware', 'tire', 'auto', 'shipping', 'package', 'mail']
+
+# Whole categories that carry no useful context
+BORING_CATEGORIES = {
+    'locality, political', 'political, locality',
+    'lodging', 'establishment', 'point_of_interest, establishment',
+}
+
+_EXCLUDED = 1
+_INCLUDED = 2
+_STORE = 4
+_UTILITY = 8
+_POINT_OF_INTEREST = 16
+
+
+class PlaceProfile(NamedTuple):
+    roles: Role
+    interesting: bool
+
+
+@lru_cache(maxsize=4096)
+def _token_flags(token: str):
+    """(roles, verdict flags) of one lowercased Google type"""
+    roles = Role.NONE
+    for role, keywords in ROLE_KEYWORDS.items():
+        if any(keyword in token for keyword in keywords):
+            roles |= role
+    flags = 0
+    if any(bad in token for bad in EXCLUDE_KEYWORDS):
+        flags |= _EXCLUDED
+    if any(good in token for good in INCLUDE_KEYWORDS):
+        flags |= _INCLUDED
+    if 'store' in token or 'shop' in token:
+        flags |= _STORE
+    if any(skip in token for skip in UTILITY_KEYWORDS):
+        flags |= _UTILITY
+    if 'point_of_interest' in token:
+        flags |= _POINT_OF_INTEREST
+    return roles, flags
+
+
+class PlaceClassifier:
+    """
+    Parses a place's category (its comma-joined Google types) once into a
+    role bitmask and an interesting/excluded verdict, cached per place_id.
+    """
+
+    def __init__(self, max_entries: int = PLACE_CLASSIFIER_CACHE_SIZE):
+        self._profiles = TTLCache(max_entries=max_entries, ttl=math.inf)
+
+    def classify(self, place: Place) -> PlaceProfile:
+        cached = self._profiles.get(place.place_id)
+        # Re-parse if the place's types changed since it was cached
+        if cached is not None and cached[0] == place.category:
+            return cached[1]
+        profile = self._parse(place)
+        self._profiles.set(place.place_id, (place.category, profile))
+        return profile
+
+    def interesting(self, places: List[Place]) -> List[Place]:
+        """Places worth building quests around, in their original order"""
+        return [p for p in places if self.classify(p).interesting]
+
+    def _parse(self, place: Place) -> PlaceProfile:
+        category_lower = place.category.lower()
+        tokens = category_lower.split(',')
+        roles = Role.NONE
+        flags = 0
+        for token in tokens:
+            token_roles, token_flags = _token_flags(token.strip())
+            roles |= token_roles
+            flags |= token_flags
+
+        if flags & _EXCLUDED or category_lower in BORING_CATEGORIES:
+            interesting = False
+        elif flags & _INCLUDED:
+            interesting = True
+        elif flags & _STORE and not (
+            flags & _UTILITY or any(skip in place.name.lower() for skip in UTILITY_KEYWORDS)
+        ):
+            # Be lenient with stores that aren't errands
+            interesting = True
+        else:
+            # Keep anything with "point_of_interest" that hasn't been excluded yet
+            interesting = bool(flags & _POINT_OF_INTEREST) and len(tokens) > 1
+        return PlaceProfile(roles, interesting)
+
+
+place_classifier = PlaceClassifier()
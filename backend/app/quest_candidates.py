@@ -0,0 +1,109 @@
+import uuid
+import hashlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from app.models import Event, Location, Place
+from app.distance import DistanceMatrix
+from app.spatial import PlaceGrid
+
+# Steps without coordinates are placed at (0, 0), as the built QuestStep does
+MISSING_LOCATION = Location(lat=0, lng=0)
+
+QUEST_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "sidequest/quest")
+
+
+class QuestCandidate:
+    """
+    A quest before it is built: its template and the places/events it
+    visits, in route order. Filtering, dedup and ranking run on these;
+    only the quests that are returned become Pydantic models.
+    """
+
+    __slots__ = ("score", "template", "items", "title", "distance")
+
+    def __init__(self, score: float, template: str, items: Tuple[Union[Place, Event], ...], title: str):
+        self.score = score
+        self.template = template
+        self.items = items
+        self.title = title
+        self.distance = float("inf")
+
+    @property
+    def route(self) -> List[str]:
+        """Item IDs of the steps, in order"""
+        return [item_id(item) for item in self.items]
+
+    @property
+    def event(self) -> Event:
+        """The event of an event quest"""
+        return next(item for item in self.items if isinstance(item, Event))
+
+    def at_distance(self, distance: float) -> "QuestCandidate":
+        """A copy placed at `distance` from the user; candidates themselves are shared between requests"""
+        candidate = QuestCandidate(self.score, self.template, self.items, self.title)
+        candidate.distance = distance
+        return candidate
+
+
+class PlaceStage:
+    """
+    What generation derives from places alone: the interesting places, the
+    dining places indexed for pairing with events, and the place quest
+    candidates. Kept while the places don't change.
+    """
+
+    __slots__ = ("interesting", "food_grid", "candidates")
+
+    def __init__(self, interesting: List[Place], food_grid: PlaceGrid, candidates: List[QuestCandidate]):
+        self.interesting = interesting
+        self.food_grid = food_grid
+        self.candidates = candidates
+
+
+class RankedCandidates:
+    """
+    The outcome of ranking: candidates best first with their scores, plus
+    the enrichments and distances needed to build any slice of them later.
+    """
+
+    __slots__ = ("candidates", "scores", "matrix", "enrichments")
+
+    def __init__(
+        self,
+        candidates: List[QuestCandidate],
+        scores: List[float],
+        matrix: Optional[DistanceMatrix],
+        enrichments: Dict[str, dict]
+    ):
+        self.candidates = candidates
+        self.scores = scores
+        self.matrix = matrix  # None only when there are no candidates
+        self.enrichments = enrichments
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+
+def quest_id(template: str, items: Iterable[Union[Place, Event]]) -> str:
+    """
+    Content-addressed quest ID: the same template visiting the same places
+    and events in the same order always gets the same ID, for every user.
+    """
+    route = "\x1f".join(item_id(item) for item in items)
+    return str(uuid.uuid5(QUEST_ID_NAMESPACE, f"{template}\x1f{route}"))
+
+
+def source_fingerprint(items: Sequence[Union[Place, Event]]) -> str:
+    """Content hash of a source's places or events, in order"""
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(item.model_dump_json().encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def item_id(item: Union[Place, Event]) -> str:
+    return item.event_id if isinstance(item, Event) else item.place_id
+
+
+def item_location(item: Union[Place, Event]) -> Location:
+    return item.location or MISSING_LOCATION
@@ -1,8 +1,63 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import os
 import uuid
-import math
+import heapq
+import numpy as np
 from app.models import Quest, QuestStep, Place, Event, Location
+from app.pairing import best_pairs
+from app.spatial import PlaceGrid
+from app.distance import DistanceMatrix
+from app.quest_candidates import (
+    PlaceStage, QuestCandidate, RankedCandidates, item_id, item_location, quest_id, source_fingerprint
+)
+from app.place_classifier import Role, place_classifier
+from app.ranking import score_quests, top_k
+from app.ttl_cache import TTLCache
+
+# Prompt context used when enriching an event; shared by every quest built from it
+EVENT_ENRICHMENT_CONTEXT = "Main event of the night"
+
+# Most candidates a single template may contribute per request
+TEMPLATE_CAPS = {
+    "coffee_walk": 5,
+    "food_tour": 15,
+    "budget": 10,
+    "shopping": 6,
+    "night_out": 20,
+    "exploration": 15,
+    "event": 40,
+    "event_combo": 60,
+}
+# Which items of a (first, second) pair template's title are named in it (see _quest_title)
+PAIR_TITLE_ITEMS = {
+    "coffee_walk": (),
+    "budget": (),
+    "food_tour": (0,),
+    "shopping": (0,),
+    "night_out": (0, 1),
+}
+# Most quests returned per request, best ranked first
+MAX_QUEST_RESULTS = int(os.getenv("QUEST_MAX_RESULTS", "50"))
+# Each event is paired with its nearest food places within walking distance of the venue
+EVENT_FOOD_PAIRINGS = int(os.getenv("QUEST_EVENT_FOOD_PAIRINGS", "3"))
+EVENT_WALKING_RADIUS_KM = float(os.getenv("QUEST_EVENT_WALKING_RADIUS_KM", "1.5"))
+# Candidates derived from unchanged places/events are reused across generations
+QUEST_STAGE_CACHE_SIZE = int(os.getenv("QUEST_STAGE_CACHE_SIZE", "256"))
+QUEST_STAGE_TTL_SECONDS = float(os.getenv("QUEST_STAGE_TTL_SECONDS", "3600"))
+
+# Template families; generation can run them separately (e.g. in parallel workers)
+PLACE_FAMILY = "place"
+EVENT_FAMILY = "event"
+QUEST_FAMILIES = (PLACE_FAMILY, EVENT_FAMILY)
+
+# Candidate scores are on the 0-5 rating scale; unrated places and events get a neutral default
+UNRATED_PLACE_SCORE = 3.5
+EVENT_SCORE = 4.5
+
+
+def _place_score(place: Place) -> float:
+    return place.rating if place.rating is not None else UNRATED_PLACE_SCORE
 
 class QuestGenerator:
     """
@@ -11,7 +66,6 @@ class QuestGenerator:
     """
     
     def __init__(self):
-        self.user_location = None
         self.quest_templates = {
             "coffee_walk": {
                 "title": "Coffee & Chill Walk",
@@ -42,13 +96,16 @@ class QuestGenerator:
                 "tags": ["nightlife", "events", "social"]
             }
         }
+        # Intermediate results keyed by source fingerprints (see _place_stage/_event_stage)
+        self._stages = TTLCache(max_entries=QUEST_STAGE_CACHE_SIZE, ttl=QUEST_STAGE_TTL_SECONDS)
     
     def generate_quests(
         self,
         places: List[Place],
         events: List[Event],
         user_location: Location,
-        preferences: dict
+        preferences: dict,
+        enrichments: Optional[Dict[str, dict]] = None
     ) -> List[Quest]:
         """
         Generate themed quests from available places and events
@@ -57,45 +114,85 @@ class QuestGenerator:
             places: List of nearby places
             events: List of nearby events
             user_location: User's current location
-            preferences: User preferences (budget, mood, categories)
+            preferences: User preferences (budget, mood, categories, radius_km)
+            enrichments: Gemini enrichment per event_id (see enrich_events_async);
+                events without one are enriched synchronously
         
         Returns:
-            List of generated Quest objects sorted by distance
+            Up to MAX_QUEST_RESULTS Quest objects, best match first
         """
-        self.user_location = user_location
-        quests = []
+        return [quest for _, quest in self.generate_ranked(places, events, user_location, preferences, enrichments)]
+    
+    def generate_ranked(
+        self,
+        places: List[Place],
+        events: List[Event],
+        user_location: Location,
+        preferences: dict,
+        enrichments: Optional[Dict[str, dict]] = None,
+        families: Tuple[str, ...] = QUEST_FAMILIES
+    ) -> List[Tuple[float, Quest]]:
+        """
+        generate_quests restricted to some template families, returning
+        (score, quest) pairs best first. Runs for separate families can be
+        combined with merge_ranked.
+        """
+        ranked = self.rank_candidates(places, events, user_location, preferences, enrichments, families)
+        return list(zip(ranked.scores, self.build_ranked(ranked)))
+    
+    def rank_candidates(
+        self,
+        places: List[Place],
+        events: List[Event],
+        user_location: Location,
+        preferences: dict,
+        enrichments: Optional[Dict[str, dict]] = None,
+        families: Tuple[str, ...] = QUEST_FAMILIES,
+        limit: int = MAX_QUEST_RESULTS
+    ) -> RankedCandidates:
+        """
+        Everything generate_ranked does short of building quests: the best
+        `limit` candidates in rank order. Build them, or any slice of them,
+        with build_ranked.
+        """
+        enrichments = enrichments or {}
+        candidates = []
         
-        # Generate different types of quests based on available data
-        if places:
-            quests.extend(self._generate_place_quests(places, preferences))
+        # Collect scored candidates per template; only the quests returned are built.
+        # Place candidates are reused while places are unchanged, event
+        # candidates while neither places nor events change.
+        places_key = source_fingerprint(places)
+        if PLACE_FAMILY in families and places:
+            candidates.extend(self._place_stage(places, places_key).candidates)
         
-        if events:
-            quests.extend(self._generate_event_quests(events, places, preferences))
+        if EVENT_FAMILY in families and events:
+            candidates.extend(self._event_stage(events, places, places_key))
         
         # If no quests generated from real data, return empty list
         # Let the frontend handle the "no quests found" case
-        if not quests:
+        if not candidates:
             print("WARNING: No quests could be generated from places/events data")
             print(f"  Places found: {len(places)}")
             print(f"  Events found: {len(events)}")
-            return []
-        
-        # Calculate distances for all quests
-        for quest in quests:
-            quest.distance = self._calculate_quest_distance(quest)
+            return RankedCandidates([], [], None, enrichments)
         
-        # Sort by distance (closest first)
-        quests.sort(key=lambda q: q.distance if hasattr(q, 'distance') else float('inf'))
+        # Distances from the user and between steps, computed once for all candidates
+        points = {}
+        for candidate in candidates:
+            for item in candidate.items:
+                points.setdefault(item_id(item), item_location(item))
+        matrix = DistanceMatrix(user_location, points)
+        distances = matrix.first_distances([c.route for c in candidates])
         
-        # Remove duplicate quests (same title)
+        # Sort by distance (closest first) and remove duplicate quests (same title)
         seen_titles = set()
-        unique_quests = []
-        for quest in quests:
-            if quest.title not in seen_titles:
-                seen_titles.add(quest.title)
-                unique_quests.append(quest)
-        quests = unique_quests
-        print(f"Removed {len(quests) - len(unique_quests)} duplicate quests")
+        unique = []
+        for i in np.argsort(distances, kind="stable"):
+            if candidates[i].title not in seen_titles:
+                seen_titles.add(candidates[i].title)
+                unique.append(i)
+        print(f"Removed {len(candidates) - len(unique)} duplicate quests")
+        unique = np.array(unique, dtype=int)
         
         # Filter quests within the specified radius range
         radius_km = preferences.get('radius_km')
@@ -103,183 +200,347 @@ class QuestGenerator:
         if radius_km:
             min_distance = max(0, min_radius_km)
             max_distance = radius_km
-            quests = [q for q in quests if hasattr(q, 'distance') and q.distance and min_distance <= q.distance <= max_distance]
-            print(f"Filtered to {len(quests)} quests between {min_distance} km and {max_distance} km")
+            unique = unique[(distances[unique] >= min_distance) & (distances[unique] <= max_distance)]
+            print(f"Filtered to {len(unique)} quests between {min_distance} km and {max_distance} km")
+        
+        selected = [candidates[i].at_distance(float(distances[i])) for i in unique]
+        
+        # Rank on the user's preferences, keeping only the best
+        profiles = [
+            self._quest_profile(
+                c.template, c.items,
+                enrichments.get(c.event.event_id) if c.template in ("event", "event_combo") else None
+            )
+            for c in selected
+        ]
+        scores = score_quests(
+            costs=[cost for _, cost, _ in profiles],
+            distances=[c.distance for c in selected],
+            ratings=[c.score for c in selected],
+            tags=[[category, *tags] for category, _, tags in profiles],
+            preferences=preferences
+        )
+        order = top_k(scores, [c.distance for c in selected], limit)
+        print(f"Returning the best {len(order)} of {len(selected)} quests")
         
-        return quests  # Return all quests sorted by distance
+        return RankedCandidates([selected[i] for i in order], scores[order].tolist(), matrix, enrichments)
     
-    def _generate_place_quests(
-        self, 
-        places: List[Place], 
-        preferences: dict
-    ) -> List[Quest]:
-        """Generate quests from places only"""
-        quests = []
+    def build_ranked(self, ranked: RankedCandidates, start: int = 0, stop: Optional[int] = None) -> List[Quest]:
+        """Build the quests for ranked.candidates[start:stop]"""
+        return self._build_quests(ranked.candidates[start:stop], ranked.enrichments, ranked.matrix)
+    
+    @staticmethod
+    def merge_ranked(runs: List[List[Tuple[float, Quest]]], limit: int = MAX_QUEST_RESULTS) -> List[Quest]:
+        """Combine generate_ranked results from separate families into one ranked list"""
+        ranked = sorted((pair for run in runs for pair in run), key=lambda pair: (-pair[0], pair[1].distance))
+        seen_titles = set()
+        merged = []
+        for _, quest in ranked:
+            if quest.title in seen_titles:
+                continue
+            seen_titles.add(quest.title)
+            merged.append(quest)
+            if len(merged) >= limit:
+                break
+        return merged
+    
+    def _place_stage(self, places: List[Place], places_key: str) -> PlaceStage:
+        """The PlaceStage for `places`, reused while their fingerprint is unchanged"""
+        stage = self._stages.get(("places", places_key))
+        if stage is None:
+            filtered_places = self._filter_interesting_places(places) if places else []
+            food_grid = PlaceGrid(
+                [p for p in filtered_places if place_classifier.classify(p).roles & Role.DINING],
+                cell_km=EVENT_WALKING_RADIUS_KM
+            )
+            stage = PlaceStage(filtered_places, food_grid, self._place_quest_candidates(places, filtered_places))
+            self._stages.set(("places", places_key), stage)
+        return stage
+    
+    def _event_stage(self, events: List[Event], places: List[Place], places_key: str) -> List[QuestCandidate]:
+        """Event quest candidates, reused while both events and places are unchanged"""
+        key = ("events", places_key, source_fingerprint(events))
+        candidates = self._stages.get(key)
+        if candidates is None:
+            food_grid = self._place_stage(places, places_key).food_grid
+            candidates = self._event_quest_candidates(events, food_grid)
+            self._stages.set(key, candidates)
+        else:
+            print(f"Reusing {len(candidates)} event quest candidates (events and places unchanged)")
+        return candidates
+    
+    def _place_quest_candidates(self, places: List[Place], filtered_places: List[Place]) -> List[QuestCandidate]:
+        """
+        Score candidate place quests from the interesting subset of `places`
+        
+        Each template contributes at most TEMPLATE_CAPS[template] candidates,
+        taken best-first by place rating without enumerating every pairing.
+        """
+        candidates = []
         
         if not places:
-            return quests
+            return candidates
         
-        # Filter out boring/utility places
-        filtered_places = self._filter_interesting_places(places)
         print(f"Generating quests from {len(filtered_places)} places (filtered from {len(places)})...")
         
         if not filtered_places:
             print("  No interesting places found after filtering")
-            return quests
-        
-        # Categorize places
-        cafes = [p for p in filtered_places if 'cafe' in p.category.lower() or 'coffee' in p.category.lower()]
-        parks = [p for p in filtered_places if 'park' in p.category.lower() or 'outdoor' in p.category.lower()]
-        restaurants = [p for p in filtered_places if 'restaurant' in p.category.lower() or 'food' in p.category.lower()]
-        bars = [p for p in filtered_places if 'bar' in p.category.lower() or 'night_club' in p.category.lower()]
-        shops = [p for p in filtered_places if 'store' in p.category.lower() or 'shop' in p.category.lower() or 'shopping' in p.category.lower()]
+            return candidates
+        
+        # Categorize places, best rated first
+        ranked = sorted(filtered_places, key=_place_score, reverse=True)
+        roles = [place_classifier.classify(p).roles for p in ranked]
+        cafes = [p for p, r in zip(ranked, roles) if r & Role.CAFE]
+        parks = [p for p, r in zip(ranked, roles) if r & Role.PARK]
+        restaurants = [p for p, r in zip(ranked, roles) if r & Role.RESTAURANT]
+        bars = [p for p, r in zip(ranked, roles) if r & Role.BAR]
+        shops = [p for p, r in zip(ranked, roles) if r & Role.SHOP]
+        cheap_eats = [p for p in ranked if p.price_level and p.price_level <= 2]
         
         print(f"  Found {len(cafes)} cafes, {len(parks)} parks, {len(restaurants)} restaurants, {len(bars)} bars, {len(shops)} shops")
         
-        # Coffee + Walk quests (create multiple if we have enough cafes/parks)
-        for i in range(min(len(cafes), len(parks), 5)):
-            if i < len(cafes) and i < len(parks):
-                quest = self._create_coffee_walk_quest(cafes[i], parks[i] if i < len(parks) else parks[0])
-                quests.append(quest)
-                print(f"  Created Coffee Walk quest {i+1}")
-        
-        # Food tour quests (create ALL possible combinations)
-        if len(restaurants) >= 2:
-            for i in range(0, len(restaurants) - 1):
-                for j in range(i + 1, min(i + 4, len(restaurants))):
-                    quest = self._create_food_tour_quest([restaurants[i], restaurants[j]])
-                    quests.append(quest)
-                    print(f"  Created Food Tour quest")
-        
-        # Budget food quests (create more combinations)
-        cheap_eats = [p for p in filtered_places if p.price_level and p.price_level <= 2]
-        if len(cheap_eats) >= 2:
-            for i in range(0, len(cheap_eats) - 1):
-                for j in range(i + 1, min(i + 3, len(cheap_eats))):
-                    quest = self._create_budget_quest([cheap_eats[i], cheap_eats[j]])
-                    quests.append(quest)
-                    print(f"  Created Budget quest")
-        
-        # Shopping + Cafe quests (limit combinations to avoid duplicates)
-        if len(shops) > 0 and len(cafes) > 0:
-            # Only create a few shopping quests, not all combinations
-            for i in range(min(3, len(shops))):
-                for j in range(min(2, len(cafes))):
-                    quest = self._create_shopping_quest(shops[i], cafes[j])
-                    quests.append(quest)
-                    print(f"  Created Shopping quest")
-        
-        # Night out quests (create ALL combinations of bars + restaurants)
-        if len(bars) > 0 and len(restaurants) > 0:
-            for i in range(len(restaurants)):
-                for j in range(len(bars)):
-                    quest = self._create_night_out_quest(restaurants[i], bars[j])
-                    quests.append(quest)
-                    print(f"  Created Night Out quest")
-        
-        # Generic exploration quests (create many combinations)
-        for i in range(0, len(filtered_places) - 2):
-            if i + 2 < len(filtered_places):
-                quest = self._create_exploration_quest(filtered_places[i:i+3])
-                quests.append(quest)
-                print(f"  Created Exploration quest")
+        candidates.extend(self._pair_candidates("coffee_walk", cafes, parks))
+        candidates.extend(self._pair_candidates("food_tour", restaurants, restaurants))
+        candidates.extend(self._pair_candidates("budget", cheap_eats, cheap_eats))
+        candidates.extend(self._pair_candidates("shopping", shops, cafes))
+        candidates.extend(self._pair_candidates("night_out", restaurants, bars))
+        
+        # Exploration quests walk three consecutive places in search order
+        windows = [tuple(filtered_places[i:i + 3]) for i in range(len(filtered_places) - 2)]
+        candidates.extend(
+            QuestCandidate(sum(map(_place_score, window)) / 3, "exploration", window, self._quest_title("exploration", window))
+            for window in heapq.nlargest(TEMPLATE_CAPS["exploration"], windows, key=lambda w: sum(map(_place_score, w)))
+        )
         
-        return quests
+        print(f"  {len(candidates)} place quest candidates")
+        return candidates
+    
+    def _pair_candidates(self, template: str, first: List[Place], second: List[Place]) -> List[QuestCandidate]:
+        """
+        Best-scoring (first, second) pairs of two rating-sorted lists with
+        distinct titles, up to the template cap
+        
+        Quests are deduplicated on title, so the cap counts distinct titles.
+        Pairs with a title already taken are skipped; distinct places can
+        share a name, so that's decided on the title, not on the items.
+        PAIR_TITLE_ITEMS says when the rest of a row can be skipped too.
+        """
+        same = first is second
+        first_scores = [_place_score(p) for p in first]
+        second_scores = first_scores if same else [_place_score(p) for p in second]
+        
+        title_items = PAIR_TITLE_ITEMS[template]
+        candidates = []
+        titles = set()
+        done_rows = set()  # rows whose title is fixed by the first item and already taken
+        for i, j in best_pairs(first_scores, second_scores, same=same):
+            if len(candidates) >= TEMPLATE_CAPS[template]:
+                break
+            if i in done_rows or first[i].place_id == second[j].place_id:
+                continue
+            items = (first[i], second[j])
+            title = self._quest_title(template, items)
+            if title not in titles:
+                titles.add(title)
+                candidates.append(QuestCandidate((first_scores[i] + second_scores[j]) / 2, template, items, title))
+            if not title_items:
+                break  # one title for the whole template
+            if title_items == (0,):
+                done_rows.add(i)
+        return candidates
     
     def _filter_interesting_places(self, places: List[Place]) -> List[Place]:
         """Filter out boring utility places and keep only interesting venues"""
+        return place_classifier.interesting(places)
+    
+    def _event_quest_candidates(self, events: List[Event], food_grid: PlaceGrid) -> List[QuestCandidate]:
+        """Score candidate event quests, pairing events with dining places from `food_grid`"""
+        print(f"Generating event quests from {len(events)} events...")
         
-        # Strict exclusions - definitely not interesting for quests
-        exclude_keywords = [
-            'gas_station', 'parking', 'atm', 
-            'car_wash', 'car_repair', 'storage', 'laundry', 'locksmith',
-            'plumber', 'electrician', 'lawyer', 'insurance', 'real_estate',
-            'dentist', 'doctor', 'hospital', 'pharmacy', 'veterinary',
-            'funeral', 'cemetery',
-            'post_office', 'courthouse', 'embassy',
-        ]
-        
-        # Always include these - definitely interesting
-        include_keywords = [
-            'restaurant', 'cafe', 'bar', 'night_club', 'food', 'bakery',
-            'meal_delivery', 'meal_takeaway', 'pizza',
-            'museum', 'art_gallery', 'library', 'aquarium', 'zoo',
-            'park', 'amusement_park', 'bowling_alley', 'movie_theater', 
-            'stadium', 'casino', 'spa', 'gym', 'tourist_attraction',
-            'shopping_mall', 'department_store', 'clothing_store', 
-            'book_store', 'jewelry_store', 'shoe_store', 'beauty_salon',
+        # Events come ordered by start time, so the caps keep the soonest ones
+        candidates = [
+            QuestCandidate(EVENT_SCORE, "event", (event,), self._quest_title("event", (event,)))
+            for event in events[:TEMPLATE_CAPS["event"]]
         ]
         
-        filtered = []
-        for place in places:
-            category_lower = place.category.lower()
-            name_lower = place.name.lower()
-            
-            # Hard exclude - skip definitely boring places
-            if any(bad in category_lower for bad in exclude_keywords):
-                continue
-            
-            # Skip generic administrative/locality entries
-            if category_lower in ['locality, political', 'political, locality']:
-                continue
-            
-            # Skip pure "lodging" or "establishment" without other context
-            if category_lower in ['lodging', 'establishment', 'point_of_interest, establishment']:
-                continue
-            
-            # Always include if it has interesting keywords
-            if any(good in category_lower for good in include_keywords):
-                filtered.append(place)
+        # Pair each event with the closest restaurants/bars/cafes within walking distance
+        combos = []
+        for event in events:
+            if len(combos) >= TEMPLATE_CAPS["event_combo"] or not food_grid:
+                break
+            if not event.location:
                 continue
-            
-            # Be more lenient - keep stores that aren't explicitly excluded
-            if 'store' in category_lower or 'shop' in category_lower:
-                # Exclude utility stores specifically - check both name and category
-                utility_keywords = ['ups', 'fedex', 'postal', 'hardware', 'tire', 'auto', 'shipping', 'package', 'mail']
-                if not any(skip in name_lower or skip in category_lower for skip in utility_keywords):
-                    filtered.append(place)
-                    continue
-            
-            # Keep anything with "point_of_interest" that hasn't been excluded yet
-            if 'point_of_interest' in category_lower and len(category_lower.split(',')) > 1:
-                filtered.append(place)
+            for food_place in food_grid.nearest(event.location.lat, event.location.lng, EVENT_FOOD_PAIRINGS, EVENT_WALKING_RADIUS_KM):
+                items = (food_place, event)
+                combos.append(QuestCandidate(
+                    (EVENT_SCORE + _place_score(food_place)) / 2, "event_combo", items, self._quest_title("event_combo", items)
+                ))
+        candidates.extend(combos[:TEMPLATE_CAPS["event_combo"]])
+        
+        print(f"  {len(candidates)} event quest candidates")
+        return candidates
+    
+    def _build_quests(
+        self,
+        candidates: List[QuestCandidate],
+        enrichments: Dict[str, dict],
+        matrix: DistanceMatrix
+    ) -> List[Quest]:
+        """Materialize candidates into Quest objects, with distances and route legs"""
+        # Enrich any selected events the caller didn't in one batched call;
+        # each enrichment is shared by all quests built from that event
+        missing = {}
+        for candidate in candidates:
+            if candidate.template in ("event", "event_combo") and candidate.event.event_id not in enrichments:
+                missing.setdefault(candidate.event.event_id, candidate.event)
+        if missing:
+            enrichments = {**enrichments, **dict(zip(missing, self._enrich_events(list(missing.values()))))}
+        
+        quests = []
+        for candidate in candidates:
+            template, items = candidate.template, candidate.items
+            if template == "coffee_walk":
+                quest = self._create_coffee_walk_quest(*items)
+            elif template == "food_tour":
+                quest = self._create_food_tour_quest(list(items))
+            elif template == "budget":
+                quest = self._create_budget_quest(list(items))
+            elif template == "shopping":
+                quest = self._create_shopping_quest(*items)
+            elif template == "night_out":
+                quest = self._create_night_out_quest(*items)
+            elif template == "exploration":
+                quest = self._create_exploration_quest(list(items))
+            elif template == "event":
+                quest = self._create_standalone_event_quest(items[0], enrichments[items[0].event_id])
+            else:
+                food_place, event = items
+                quest = self._create_event_quest(event, food_place, enrichments[event.event_id])
+            quest.distance = candidate.distance
+            for step, leg in zip(quest.steps, matrix.route_legs(candidate.route)):
+                step.leg_distance = leg
+            quests.append(quest)
+        return quests
+    
+    def _quest_title(self, template: str, items: tuple) -> str:
+        """Title of the quest built from a candidate; quests are deduplicated on it"""
+        if template == "coffee_walk":
+            return "Coffee & Nature Walk"
+        if template == "budget":
+            return "$20 Budget Night"
+        if template == "food_tour":
+            return f"Food Tour: {items[0].name} & More"
+        if template == "shopping":
+            return f"Shop & Relax at {items[0].name}"
+        if template == "night_out":
+            return f"Night Out: {items[0].name} & {items[1].name}"
+        if template == "exploration":
+            return f"Explore {items[0].name} Area"
+        if template == "event":
+            return items[0].name
+        return f"{items[1].name} Night Out"
+    
+    def _quest_profile(self, template: str, items: tuple, enriched: Optional[dict] = None) -> Tuple[str, float, List[str]]:
+        """(category, estimated_cost, tags) of the quest built from a candidate; ranking scores on these"""
+        if template == "coffee_walk":
+            cafe = items[0]
+            return "chill", float(cafe.price_level or 2) * 5, ["Cafe", "Active", "Relaxation", "Urban"]
+        if template == "budget":
+            return "budget", sum([p.price_level or 1 for p in items]) * 8, ["Cheap", "Food", "Social"]
+        if template == "food_tour":
+            # Only add 'Local Favorites' if places have good ratings
+            tags = ["Food", "Cultural"] + (["Local Favorites"] if self._has_high_ratings(list(items)) else [])
+            return "food", float(sum([p.price_level or 2 for p in items]) * 15), tags
+        if template == "shopping":
+            shop, cafe = items
+            return "leisure", float(((shop.price_level or 2) + (cafe.price_level or 2)) * 12), ["Shopping", "Cafe", "Relaxation"]
+        if template == "night_out":
+            restaurant, bar = items
+            return "nightlife", float(((restaurant.price_level or 3) + (bar.price_level or 2)) * 20), ["Nightlife", "Social", "Food", "Bar"]
+        if template == "exploration":
+            tags = ["Adventure", "Hidden Gems"] + (["Local Favorites"] if self._has_high_ratings(list(items)) else [])
+            return "exploration", float(sum([p.price_level or 2 for p in items]) * 10), tags
+        enriched = enriched or {}
+        if template == "event":
+            return (
+                (enriched.get('categories') or ['event'])[0],
+                float(enriched.get('estimated_cost', 30.0)),
+                enriched.get('categories') or ["Events", "Entertainment", "Live"]
+            )
+        food_place = items[0]
+        return (
+            "social",
+            float(enriched.get('estimated_cost', 50.0)) + float(food_place.price_level or 2) * 20,
+            (enriched.get('categories') or ["Events", "Nightlife"]) + ["Social", "Food"]
+        )
+    
+    async def enrich_events_async(self, events: List[Event], budget: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Enrich events concurrently under the Gemini time budget, ahead of
+        generate_quests; events that don't finish in time get fallback values.
         
-        return filtered
+        budget=0 returns cached enrichments only, without calling Gemini.
+        """
+        from app.gemini_service import gemini_service
+        items = [self._enrichment_item(e) for e in events]
+        if budget is None:
+            enriched = await gemini_service.enrich_quest_items_async(items)
+        else:
+            enriched = await gemini_service.enrich_quest_items_async(items, budget=budget)
+        return {event.event_id: data for event, data in zip(events, enriched)}
     
-    def _generate_event_quests(
+    def reenrich_quests(
         self,
+        quests: List[Quest],
         events: List[Event],
         places: List[Place],
-        preferences: dict
+        enrichments: Dict[str, dict]
     ) -> List[Quest]:
-        """Generate quests combining events with nearby places"""
-        quests = []
-        
-        print(f"Generating event quests from {len(events)} events...")
-        
-        # Filter interesting places for events
-        filtered_places = self._filter_interesting_places(places)
-        
-        # Create quests for ALL events
-        for event in events:
-            # Create standalone event quest
-            quest = self._create_standalone_event_quest(event)
-            quests.append(quest)
-            print(f"  Created standalone event quest: {event.name}")
-            
-            # Find nearby restaurants/bars
-            nearby_food = [p for p in filtered_places if 
-                          'restaurant' in p.category.lower() or 
-                          'bar' in p.category.lower() or
-                          'cafe' in p.category.lower()]
-            
-            # Create event + food combinations
-            for food_place in nearby_food:
-                quest = self._create_event_quest(event, food_place)
-                quests.append(quest)
-                print(f"  Created event combo quest")
+        """
+        Rebuild the event quests in `quests` with new enrichments, keeping
+        their IDs, distances and creation times
         
-        return quests
+        Returns:
+            Only the quests that were rebuilt
+        """
+        events_by_id = {e.event_id: e for e in events}
+        places_by_id = {p.place_id: p for p in places}
+        updated = []
+        for quest in quests:
+            event_steps = [s for s in quest.steps if s.type == "event"]
+            if not event_steps or event_steps[0].item_id not in enrichments:
+                continue
+            event = events_by_id.get(event_steps[0].item_id)
+            if event is None:
+                continue
+            enriched = enrichments[event.event_id]
+            if len(quest.steps) == 1:
+                rebuilt = self._create_standalone_event_quest(event, enriched)
+            else:
+                food_place = places_by_id.get(quest.steps[0].item_id)
+                if food_place is None:
+                    continue
+                rebuilt = self._create_event_quest(event, food_place, enriched)
+            rebuilt.quest_id = quest.quest_id
+            rebuilt.distance = quest.distance
+            for step, old_step in zip(rebuilt.steps, quest.steps):
+                step.leg_distance = old_step.leg_distance
+            rebuilt.created_at = quest.created_at
+            updated.append(rebuilt)
+        return updated
+    
+    def _enrich_events(self, events: List[Event]) -> List[dict]:
+        """Estimate cost, duration, categories and difficulty for events with Gemini"""
+        from app.gemini_service import gemini_service
+        return gemini_service.enrich_quest_items([self._enrichment_item(e) for e in events])
+    
+    def _enrichment_item(self, event: Event) -> dict:
+        return {
+            "name": event.name,
+            "description": event.description or f"Event at {event.venue}",
+            "context": EVENT_ENRICHMENT_CONTEXT,
+            "item_id": event.event_id
+        }
     
     def _has_high_ratings(self, places: List[Place], min_rating: float = 4.0) -> bool:
         """Check if places have ratings above threshold"""
@@ -290,14 +551,15 @@ class QuestGenerator:
     
     def _create_coffee_walk_quest(self, cafe: Place, park: Place) -> Quest:
         """Create a coffee + walk quest"""
+        category, estimated_cost, tags = self._quest_profile("coffee_walk", (cafe, park))
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title="Coffee & Nature Walk",
+            quest_id=quest_id("coffee_walk", (cafe, park)),
+            title=self._quest_title("coffee_walk", (cafe, park)),
             description=f"Start with coffee at {cafe.name}, then enjoy a walk at {park.name}",
-            category="chill",
+            category=category,
             difficulty="low_energy",
             estimated_time=60,
-            estimated_cost=float(cafe.price_level or 2) * 5,
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=1,
@@ -320,23 +582,23 @@ class QuestGenerator:
                     photo_url=park.photo_url
                 )
             ],
-            tags=["Cafe", "Active", "Relaxation", "Urban"],
+            tags=tags,
             best_time="morning",
             created_at=datetime.now()
         )
     
     def _create_budget_quest(self, places: List[Place]) -> Quest:
         """Create a budget-friendly quest"""
-        total_cost = sum([p.price_level or 1 for p in places]) * 8
+        category, estimated_cost, tags = self._quest_profile("budget", places)
         
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title="$20 Budget Night",
+            quest_id=quest_id("budget", places),
+            title=self._quest_title("budget", places),
             description="Affordable eats and hangout spots",
-            category="budget",
+            category=category,
             difficulty="low_energy",
             estimated_time=90,
-            estimated_cost=total_cost,
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=i+1,
@@ -349,30 +611,23 @@ class QuestGenerator:
                     photo_url=place.photo_url
                 ) for i, place in enumerate(places)
             ],
-            tags=["Cheap", "Food", "Social"],
+            tags=tags,
             best_time="evening",
             created_at=datetime.now()
         )
     
     def _create_food_tour_quest(self, places: List[Place]) -> Quest:
         """Create a food tour quest"""
-        total_cost = sum([p.price_level or 2 for p in places]) * 15
-        
-        # Base tags
-        tags = ["Food", "Cultural"]
-        
-        # Only add 'Local Favorites' if places have good ratings
-        if self._has_high_ratings(places):
-            tags.append("Local Favorites")
+        category, estimated_cost, tags = self._quest_profile("food_tour", places)
         
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=f"Food Tour: {places[0].name} & More",
+            quest_id=quest_id("food_tour", places),
+            title=self._quest_title("food_tour", places),
             description=f"Sample the best local flavors",
-            category="food",
+            category=category,
             difficulty="low_energy",
             estimated_time=90,
-            estimated_cost=float(total_cost),
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=i+1,
@@ -392,16 +647,16 @@ class QuestGenerator:
     
     def _create_shopping_quest(self, shop: Place, cafe: Place) -> Quest:
         """Create a shopping + cafe break quest"""
-        total_cost = ((shop.price_level or 2) + (cafe.price_level or 2)) * 12
+        category, estimated_cost, tags = self._quest_profile("shopping", (shop, cafe))
         
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=f"Shop & Relax at {shop.name}",
+            quest_id=quest_id("shopping", (shop, cafe)),
+            title=self._quest_title("shopping", (shop, cafe)),
             description=f"Browse {shop.name}, then recharge at {cafe.name}",
-            category="leisure",
+            category=category,
             difficulty="low_energy",
             estimated_time=75,
-            estimated_cost=float(total_cost),
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=1,
@@ -424,23 +679,23 @@ class QuestGenerator:
                     photo_url=cafe.photo_url
                 )
             ],
-            tags=["Shopping", "Cafe", "Relaxation"],
+            tags=tags,
             best_time="afternoon",
             created_at=datetime.now()
         )
     
     def _create_night_out_quest(self, restaurant: Place, bar: Place) -> Quest:
         """Create a dinner + drinks quest"""
-        total_cost = ((restaurant.price_level or 3) + (bar.price_level or 2)) * 20
+        category, estimated_cost, tags = self._quest_profile("night_out", (restaurant, bar))
         
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=f"Night Out: {restaurant.name} & {bar.name}",
+            quest_id=quest_id("night_out", (restaurant, bar)),
+            title=self._quest_title("night_out", (restaurant, bar)),
             description=f"Dinner at {restaurant.name}, drinks at {bar.name}",
-            category="nightlife",
+            category=category,
             difficulty="medium_energy",
             estimated_time=150,
-            estimated_cost=float(total_cost),
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=1,
@@ -463,30 +718,23 @@ class QuestGenerator:
                     photo_url=bar.photo_url
                 )
             ],
-            tags=["Nightlife", "Social", "Food", "Bar"],
+            tags=tags,
             best_time="evening",
             created_at=datetime.now()
         )
     
     def _create_exploration_quest(self, places: List[Place]) -> Quest:
         """Create a generic exploration quest from any places"""
-        total_cost = sum([p.price_level or 2 for p in places]) * 10
-        
-        # Base tags
-        tags = ["Adventure", "Hidden Gems"]
-        
-        # Only add 'Local Favorites' if places have good ratings
-        if self._has_high_ratings(places):
-            tags.append("Local Favorites")
+        category, estimated_cost, tags = self._quest_profile("exploration", places)
         
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=f"Explore {places[0].name} Area",
+            quest_id=quest_id("exploration", places),
+            title=self._quest_title("exploration", places),
             description=f"Discover interesting spots near {places[0].name}",
-            category="exploration",
+            category=category,
             difficulty="low_energy",
             estimated_time=120,
-            estimated_cost=float(total_cost),
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=i+1,
@@ -504,25 +752,17 @@ class QuestGenerator:
             created_at=datetime.now()
         )
     
-    def _create_standalone_event_quest(self, event: Event) -> Quest:
+    def _create_standalone_event_quest(self, event: Event, enriched: dict) -> Quest:
         """Create a standalone event quest"""
-        
-        # Enrich with Gemini
-        from app.gemini_service import gemini_service
-        enriched = gemini_service.enrich_quest_item(
-            name=event.name,
-            description=event.description or f"Event at {event.venue}",
-            context="Standalone event quest"
-        )
-        
+        category, estimated_cost, tags = self._quest_profile("event", (event,), enriched)
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=event.name,
+            quest_id=quest_id("event", (event,)),
+            title=self._quest_title("event", (event,)),
             description=f"Attend {event.name}" + (f" at {event.venue}" if event.venue else ""),
-            category=enriched.get('categories', ['event'])[0],
+            category=category,
             difficulty=enriched.get('difficulty', 'medium_energy'),
             estimated_time=enriched.get('estimated_time', 120),
-            estimated_cost=float(enriched.get('estimated_cost', 30.0)),
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=1,
@@ -534,30 +774,22 @@ class QuestGenerator:
                     location=event.location or Location(lat=0, lng=0)
                 )
             ],
-            tags=enriched.get('categories', ["Events", "Entertainment", "Live"]),
+            tags=tags,
             best_time="evening",
             created_at=datetime.now()
         )
     
-    def _create_event_quest(self, event: Event, food_place: Place) -> Quest:
+    def _create_event_quest(self, event: Event, food_place: Place, enriched_event: dict) -> Quest:
         """Create an event-based quest"""
-        
-        # Enrich event with Gemini
-        from app.gemini_service import gemini_service
-        enriched_event = gemini_service.enrich_quest_item(
-            name=event.name,
-            description=event.description or f"Event at {event.venue}",
-            context="Main event of the night"
-        )
-        
+        category, estimated_cost, tags = self._quest_profile("event_combo", (food_place, event), enriched_event)
         return Quest(
-            quest_id=str(uuid.uuid4()),
-            title=f"{event.name} Night Out",
+            quest_id=quest_id("event_combo", (food_place, event)),
+            title=self._quest_title("event_combo", (food_place, event)),
             description=f"Dinner at {food_place.name} before {event.name}",
-            category="social",
+            category=category,
             difficulty=enriched_event.get('difficulty', 'medium_energy'),
             estimated_time=enriched_event.get('estimated_time', 120) + 60,
-            estimated_cost=float(enriched_event.get('estimated_cost', 50.0)) + float(food_place.price_level or 2) * 20,
+            estimated_cost=estimated_cost,
             steps=[
                 QuestStep(
                     order=1,
@@ -579,67 +811,11 @@ class QuestGenerator:
                     location=event.location or Location(lat=0, lng=0)
                 )
             ],
-            tags=enriched_event.get('categories', ["Events", "Nightlife"]) + ["Social", "Food"],
+            tags=tags,
             best_time="evening",
             created_at=datetime.now()
         )
     
-    def _calculate_quest_distance(self, quest: Quest) -> float:
-        """
-        Calculate distance from user to first step of quest using Haversine formula
-        
-        Returns:
-            Distance in kilometers
-        """
-        if not quest.steps or not self.user_location:
-            return float('inf')
-        
-        first_step = quest.steps[0]
-        if not first_step.location:
-            return float('inf')
-        
-        # Haversine formula
-        lat1, lon1 = math.radians(self.user_location.lat), math.radians(self.user_location.lng)
-        lat2, lon2 = math.radians(first_step.location.lat), math.radians(first_step.location.lng)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Earth radius in kilometers
-        radius = 6371
-        
-        return c * radius
-    
-    def _score_quests(self, quests: List[Quest], preferences: dict) -> List[Quest]:
-        """Score and sort quests based on user preferences"""
-        scores = []
-        
-        for quest in quests:
-            s = 0.0
-            
-            # Budget match
-            budget = preferences.get('budget', 'moderate')
-            if budget == 'broke' and quest.estimated_cost < 25:
-                s += 2.0
-            elif budget == 'moderate' and 25 <= quest.estimated_cost < 60:
-                s += 2.0
-            elif budget == 'bougie' and quest.estimated_cost >= 60:
-                s += 2.0
-            
-            # Mood match
-            mood = preferences.get('mood', '')
-            if mood in quest.tags:
-                s += 1.5
-            
-            scores.append((quest, s))
-        
-        # Sort by score (descending)
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return [q for q, _ in scores]
-    
     def _generate_fallback_quests(self, user_location: Location) -> List[Quest]:
         """Generate hardcoded fallback quests for demo purposes"""
         fallback_quests = []
@@ -0,0 +1,59 @@
+import os
+import uuid
+from typing import Optional, Tuple
+from app.quest_candidates import RankedCandidates
+from app.ttl_cache import TTLCache
+
+# Quests per page when a paginated request doesn't set a limit, and the most it may ask for
+QUEST_PAGE_SIZE = int(os.getenv("QUEST_PAGE_SIZE", "20"))
+QUEST_PAGE_MAX_SIZE = int(os.getenv("QUEST_PAGE_MAX_SIZE", "100"))
+# Ranked candidates kept for paging through a single generation
+QUEST_PAGE_MAX_RESULTS = int(os.getenv("QUEST_PAGE_MAX_RESULTS", "500"))
+# How long a cursor stays valid after its generation
+QUEST_CURSOR_TTL_SECONDS = float(os.getenv("QUEST_CURSOR_TTL_SECONDS", "300"))
+QUEST_CURSOR_MAX_SETS = int(os.getenv("QUEST_CURSOR_MAX_SETS", "500"))
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was never issued by QuestPages"""
+
+
+class QuestPageSet:
+    """The ranked candidates of one paginated generation"""
+
+    def __init__(self, ranked: RankedCandidates, sources: str):
+        self.set_id = uuid.uuid4().hex
+        self.ranked = ranked
+        self.sources = sources  # X-Quest-Sources header of the first page
+
+
+class QuestPages:
+    """
+    Ranked candidate sets kept for a short TTL so later pages of a
+    generation are built from them instead of regenerated. Cursors are
+    opaque "<set_id>.<offset>" strings.
+    """
+
+    def __init__(self, ttl: float = QUEST_CURSOR_TTL_SECONDS, max_sets: int = QUEST_CURSOR_MAX_SETS):
+        self._sets = TTLCache(max_entries=max_sets, ttl=ttl)
+
+    def create(self, ranked: RankedCandidates, sources: str) -> QuestPageSet:
+        page_set = QuestPageSet(ranked, sources)
+        self._sets.set(page_set.set_id, page_set)
+        return page_set
+
+    def cursor(self, page_set: QuestPageSet, offset: int) -> Optional[str]:
+        """Cursor for the page starting at `offset`, or None past the last page"""
+        if offset >= len(page_set.ranked):
+            return None
+        return f"{page_set.set_id}.{offset}"
+
+    def resolve(self, cursor: str) -> Tuple[Optional[QuestPageSet], int]:
+        """
+        (page set, offset) for a cursor; the page set is None once it has
+        expired. Raises InvalidCursor for malformed cursors.
+        """
+        set_id, _, offset = cursor.partition(".")
+        if not set_id or not offset.isdigit():
+            raise InvalidCursor(cursor)
+        return self._sets.get(set_id), int(offset)
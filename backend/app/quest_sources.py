@@ -0,0 +1,76 @@
+import os
+import asyncio
+from typing import Dict, List
+from app.models import Place, Event, Location
+from app.google_places import GooglePlacesAPI, PAGE_BUDGET_SECONDS
+from app.ticketmaster import TicketmasterAPI
+
+# Overall time budget for the upstream fetches of one quest generation
+QUEST_FETCH_DEADLINE_SECONDS = float(os.getenv("QUEST_FETCH_DEADLINE_SECONDS", "8"))
+
+SOURCE_COMPLETE = "complete"
+SOURCE_PARTIAL = "partial"
+SOURCE_SKIPPED = "skipped"
+
+
+class QuestSources:
+    """Places and events gathered for one request, with per-source status"""
+
+    def __init__(self):
+        self.places: List[Place] = []
+        self.events: List[Event] = []
+        self.status: Dict[str, str] = {}
+
+    @property
+    def complete(self) -> bool:
+        return all(status == SOURCE_COMPLETE for status in self.status.values())
+
+    def header(self) -> str:
+        """Value for the X-Quest-Sources response header"""
+        return ", ".join(f"{source}={status}" for source, status in self.status.items())
+
+
+async def fetch_quest_sources(
+    places_api: GooglePlacesAPI,
+    events_api: TicketmasterAPI,
+    location: Location,
+    radius_km: float,
+    deadline: float = QUEST_FETCH_DEADLINE_SECONDS
+) -> QuestSources:
+    """
+    Fetch places and events concurrently under one deadline.
+
+    A source that misses the deadline or fails degrades to whatever it has
+    so far (possibly nothing) instead of failing the request.
+    """
+    sources = QuestSources()
+
+    search = places_api.start_nearby_search(location.lat, location.lng, radius_km)
+    places_task = asyncio.ensure_future(search.wait(PAGE_BUDGET_SECONDS))
+    events_task = asyncio.ensure_future(events_api.search_events_async(location.lat, location.lng, radius_km))
+
+    await asyncio.wait({places_task, events_task}, timeout=deadline)
+
+    # Places: take whatever pages have arrived; the search keeps loading in the background
+    places_task.cancel()
+    sources.places = list(search.places)
+    if search.complete and not search.failed:
+        sources.status["places"] = SOURCE_COMPLETE
+    elif search.places:
+        sources.status["places"] = SOURCE_PARTIAL
+    else:
+        sources.status["places"] = SOURCE_SKIPPED
+
+    if events_task.done() and not events_task.cancelled() and events_task.exception() is None:
+        sources.events = events_task.result()
+        sources.status["events"] = SOURCE_COMPLETE
+    else:
+        if events_task.done():
+            print(f"Error fetching events: {events_task.exception()}")
+        else:
+            events_task.cancel()
+        sources.status["events"] = SOURCE_SKIPPED
+
+    if SOURCE_SKIPPED in sources.status.values():
+        print(f"Quest sources degraded after {deadline}s: {sources.header()}")
+    return sources
@@ -0,0 +1,99 @@
+import math
+from typing import Dict, Iterable, List, Sequence
+import numpy as np
+
+# Score weights; a candidate's score is the sum of the weighted terms
+BUDGET_WEIGHT = 2.0
+MOOD_WEIGHT = 1.5
+CATEGORY_WEIGHT = 1.0
+DISTANCE_WEIGHT = 1.0
+RATING_WEIGHT = 1.0
+
+# Estimated cost range (CAD per person) that matches each budget preference
+BUDGET_BANDS = {
+    "broke": (0.0, 25.0),
+    "moderate": (25.0, 60.0),
+    "bougie": (60.0, math.inf),
+}
+
+
+def score_quests(
+    costs: Sequence[float],
+    distances: Sequence[float],
+    ratings: Sequence[float],
+    tags: Sequence[Iterable[str]],
+    preferences: dict
+) -> np.ndarray:
+    """
+    Score quests against user preferences; higher is a better match.
+
+    Args:
+        costs: Estimated cost per quest
+        distances: Distance from the user per quest, in km
+        ratings: Place rating per quest, on the 0-5 scale
+        tags: Tags (including the category) per quest
+        preferences: budget, mood, categories and radius_km
+    """
+    costs = np.asarray(costs, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    scores = RATING_WEIGHT * np.asarray(ratings, dtype=float) / 5
+
+    # Closer is better, relative to the search radius
+    finite = distances[np.isfinite(distances)]
+    radius = preferences.get('radius_km') or (finite.max() if finite.size else 0) or 1.0
+    scores += DISTANCE_WEIGHT * np.clip(1 - distances / radius, 0, 1)
+
+    band = BUDGET_BANDS.get(preferences.get('budget') or 'moderate')
+    if band:
+        scores += BUDGET_WEIGHT * ((costs >= band[0]) & (costs < band[1]))
+
+    matrix, vocabulary = _tag_matrix(tags)
+    mood = (preferences.get('mood') or '').lower()
+    if mood in vocabulary:
+        scores += MOOD_WEIGHT * matrix[:, vocabulary[mood]]
+    wanted = _matching_columns(preferences.get('categories') or [], vocabulary)
+    if wanted:
+        scores += CATEGORY_WEIGHT * matrix[:, wanted].any(axis=1)
+
+    return scores
+
+
+def top_k(scores: np.ndarray, distances: Sequence[float], limit: int) -> np.ndarray:
+    """
+    Indices of the `limit` best scores, best first (ties go to the closer
+    quest). Uses a partial selection, so only the winners are sorted.
+    """
+    distances = np.asarray(distances, dtype=float)
+    if limit <= 0:
+        return np.arange(0)
+    if limit < len(scores):
+        top = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        top = np.arange(len(scores))
+    return top[np.lexsort((distances[top], -scores[top]))]
+
+
+def _matching_columns(categories: Iterable[str], vocabulary: Dict[str, int]) -> List[int]:
+    """
+    Columns of the tags matching any category. Like the frontend's fuzzy
+    filter, a category and a tag match when either contains the other
+    (case-insensitive), so "Hidden Gem" matches "hidden gems" and "Cheap
+    Food" matches "cheap".
+    """
+    wanted = [c.strip().lower() for c in categories]
+    wanted = [c for c in wanted if c]
+    return [column for tag, column in vocabulary.items() if any(c in tag or tag in c for c in wanted)]
+
+
+def _tag_matrix(tags: Sequence[Iterable[str]]):
+    """Boolean quest x tag incidence matrix and the tag -> column mapping (tags lowercased)"""
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, quest_tags in enumerate(tags):
+        for tag in quest_tags:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(tag.lower(), len(vocabulary)))
+    matrix = np.zeros((len(tags), len(vocabulary)), dtype=bool)
+    matrix[rows, cols] = True
+    return matrix, vocabulary
@@ -0,0 +1,118 @@
+import os
+import math
+from typing import Awaitable, Callable, List, Optional, Tuple
+from app.models import Location, Quest
+from app.geo import haversine_km
+from app.ttl_cache import TTLCache, FRESH
+from app.single_flight import BackgroundTasks
+
+QUEST_CACHE_TTL_SECONDS = float(os.getenv("QUEST_CACHE_TTL_SECONDS", "300"))
+# Stale responses are still served (and refreshed in the background) for this long
+QUEST_CACHE_STALE_SECONDS = float(os.getenv("QUEST_CACHE_STALE_SECONDS", "1800"))
+# Responses built from partial sources are only trusted briefly
+QUEST_CACHE_PARTIAL_TTL_SECONDS = float(os.getenv("QUEST_CACHE_PARTIAL_TTL_SECONDS", "30"))
+QUEST_CACHE_MAX_ENTRIES = int(os.getenv("QUEST_CACHE_MAX_ENTRIES", "1000"))
+# Requests within the same lat/lng cell (~500 m) share a cached response
+QUEST_CACHE_CELL_DEGREES = float(os.getenv("QUEST_CACHE_CELL_DEGREES", "0.005"))
+
+CACHE_HIT = "HIT"
+CACHE_STALE = "STALE"
+CACHE_MISS = "MISS"
+
+
+class CachedQuests:
+    """A cached /quests/generate response"""
+
+    def __init__(self, quests: List[Quest], sources: str, origin: Location):
+        self.quests = quests
+        self.sources = sources  # X-Quest-Sources header of the original response
+        self.origin = origin
+
+    def for_location(self, location: Location, radius_km: float, min_radius_km: float = 0) -> List[Quest]:
+        """
+        Copies of the quests with distances measured from `location`. Entries
+        are shared across a cell (and warmed from its centre), so quests are
+        filtered again to the radius range around `location`.
+        """
+        if location == self.origin:
+            return [quest.model_copy() for quest in self.quests]
+        quests = []
+        for quest in self.quests:
+            if not quest.steps:
+                quests.append(quest.model_copy())
+                continue
+            first = quest.steps[0]
+            distance = haversine_km(location.lat, location.lng, first.location.lat, first.location.lng)
+            if radius_km and not max(0, min_radius_km) <= distance <= radius_km:
+                continue
+            quests.append(quest.model_copy(update={
+                "distance": distance,
+                "steps": [first.model_copy(update={"leg_distance": distance}), *quest.steps[1:]]
+            }))
+        return quests
+
+
+class QuestResponseCache:
+    """
+    Generated quests cached by quantized location, radius, categories and
+    ranking preferences. Stale entries are served while they are refreshed
+    in the background.
+    """
+
+    def __init__(
+        self,
+        ttl: float = QUEST_CACHE_TTL_SECONDS,
+        stale_ttl: float = QUEST_CACHE_STALE_SECONDS,
+        max_entries: int = QUEST_CACHE_MAX_ENTRIES,
+        cell_degrees: float = QUEST_CACHE_CELL_DEGREES
+    ):
+        self.cell_degrees = cell_degrees
+        self._entries = TTLCache(max_entries=max_entries, ttl=ttl, stale_ttl=stale_ttl)
+        self._refreshes = BackgroundTasks()
+
+    def cell(self, location: Location, radius_km: float) -> Tuple:
+        """The area part of a cache key: lat/lng cell and radius"""
+        return (
+            math.floor(location.lat / self.cell_degrees),
+            math.floor(location.lng / self.cell_degrees),
+            round(radius_km, 2)
+        )
+
+    def cell_center(self, cell: Tuple) -> Location:
+        lat_index, lng_index, _ = cell
+        return Location(lat=(lat_index + 0.5) * self.cell_degrees, lng=(lng_index + 0.5) * self.cell_degrees)
+
+    def key(self, location: Location, radius_km: float, preferences: dict) -> Tuple:
+        return (
+            *self.cell(location, radius_km),
+            tuple(sorted(c.lower() for c in preferences.get('categories') or [])),
+            (preferences.get('budget') or '').lower(),
+            (preferences.get('mood') or '').lower(),
+            preferences.get('min_radius_km') or 0
+        )
+
+    def lookup(self, key: Tuple) -> Tuple[Optional[CachedQuests], Optional[str]]:
+        """(entry, CACHE_HIT | CACHE_STALE), or (None, CACHE_MISS)"""
+        entry, state = self._entries.get_entry(key)
+        if entry is None:
+            return None, CACHE_MISS
+        return entry, CACHE_HIT if state == FRESH else CACHE_STALE
+
+    def store(self, key: Tuple, origin: Location, quests: List[Quest], sources: str, complete: bool = True):
+        ttl = None if complete else min(self._entries.ttl, QUEST_CACHE_PARTIAL_TTL_SECONDS)
+        self._entries.set(key, CachedQuests(quests, sources, origin), ttl=ttl)
+
+    def refresh_in_background(
+        self,
+        key: Tuple,
+        origin: Location,
+        generate: Callable[[], Awaitable[Tuple[List[Quest], str, bool]]]
+    ):
+        """Regenerate a stale entry once, however many requests hit it meanwhile"""
+        async def refresh():
+            try:
+                self.store(key, origin, *await generate())
+            except Exception as e:
+                print(f"Quest cache refresh failed: {e!r}")
+
+        self._refreshes.start(key, refresh)
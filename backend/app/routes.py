@@ -1,14 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Response, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
 from datetime import datetime
 from app.models import (
     Place, Event, NearbyPlacesRequest, NearbyEventsRequest, GenerateQuestsRequest, Quest, Favorite, QuestCompletion,
-    FriendRequest, Friend, Message, QuestInvite
+    FriendRequest, Friend, Message, QuestInvite, QuestGeneration
 )
-from app.quest_generator import QuestGenerator
+from app.quest_generator import QuestGenerator, MAX_QUEST_RESULTS, PLACE_FAMILY, EVENT_FAMILY
 from app.google_places import GooglePlacesAPI
 from app.ticketmaster import TicketmasterAPI
 from app.email_service import EmailService
+from app.quest_sources import (
+    QuestSources, fetch_quest_sources, QUEST_FETCH_DEADLINE_SECONDS, SOURCE_COMPLETE, SOURCE_PARTIAL, SOURCE_SKIPPED
+)
+from app.generation_jobs import GenerationJob, GenerationStore, STATUS_COMPLETE
+from app.generation_pool import PoolSaturated, generation_pool
+from app.etag import etag_matches, quest_etag
+from app.response_cache import CACHE_STALE, QuestResponseCache
+from app.warmer import CellWarmer
+from app.quest_pages import InvalidCursor, QuestPages, QUEST_PAGE_MAX_RESULTS, QUEST_PAGE_MAX_SIZE, QUEST_PAGE_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,58 +30,328 @@ quest_gen = QuestGenerator()
 places_api = GooglePlacesAPI()
 events_api = TicketmasterAPI()
 email_service = EmailService()
+generation_store = GenerationStore()
+quest_cache = QuestResponseCache()
+quest_pages = QuestPages()
+cell_warmer = CellWarmer(places_api, events_api, quest_gen, quest_cache)
 
 @router.post("/places/nearby", response_model=List[Place])
 async def get_nearby_places(request: NearbyPlacesRequest):
     """Get nearby places using Google Places API"""
-    return places_api.nearby_search(
-        request.latitude,
-        request.longitude,
-        request.radius,
-        request.type
+    return await places_api.nearby_search_async(
+        request.location.lat,
+        request.location.lng,
+        request.radius_km,
+        request.place_type,
+        request.keyword
     )
 
 @router.post("/events/nearby", response_model=List[Event])
 async def get_nearby_events(request: NearbyEventsRequest):
     """Get nearby events using Ticketmaster API"""
-    return events_api.search_events(
-        request.latitude,
-        request.longitude,
-        request.radius,
+    return await events_api.search_events_async(
+        request.location.lat,
+        request.location.lng,
+        request.radius_km,
         request.start_date,
-        request.end_date
+        request.end_date,
+        request.size
     )
 
 @router.post("/quests/generate", response_model=List[Quest])
-async def generate_quests(request: GenerateQuestsRequest):
-    """Generate personalized quests based on user preferences"""
-    # Fetch nearby places
-    places = places_api.nearby_search(
-        request.location.lat,
-        request.location.lng,
-        request.radius_km
-    )
+async def generate_quests(
+    request: GenerateQuestsRequest,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Generate personalized quests based on user preferences
     
-    # Fetch nearby events
-    events = events_api.search_events(
-        request.location.lat,
-        request.location.lng,
-        request.radius_km
+    Results are cached per area, radius and preferences (X-Cache: HIT,
+    STALE or MISS); deferred requests bypass the cache. Responses carry an
+    ETag over the quests' content; a matching If-None-Match gets 304 Not
+    Modified (except for deferred requests).
+    
+    Setting `limit` (or `cursor`) paginates: the first page ranks every
+    candidate once and later pages are built from that ranking. The next
+    page's cursor is returned in X-Next-Cursor; expired cursors get 410.
+    """
+    preferences = _quest_preferences(request)
+    cell_warmer.record(request.location, request.radius_km, preferences)
+    if request.limit is not None or request.cursor:
+        return await _quest_page(request, preferences, response, if_none_match)
+    
+    cache_key = quest_cache.key(request.location, request.radius_km, preferences)
+    cached, cache_status = (None, None) if request.defer_enrichment else quest_cache.lookup(cache_key)
+    
+    if cached is not None:
+        if cache_status == CACHE_STALE:
+            quest_cache.refresh_in_background(
+                cache_key, request.location, lambda: _generate_for_cache(request, preferences)
+            )
+        quests = cached.for_location(request.location, request.radius_km, preferences.get('min_radius_km') or 0)
+        sources_header = cached.sources
+    else:
+        try:
+            quests, sources = await _generate(request, preferences)
+        except PoolSaturated:
+            raise _pool_busy()
+        sources_header = sources.header()
+        if not request.defer_enrichment:
+            quest_cache.store(cache_key, request.location, quests, sources_header, sources.complete)
+    
+    response.headers["X-Quest-Sources"] = sources_header
+    if cache_status:
+        response.headers["X-Cache"] = cache_status
+    
+    etag = quest_etag(quests)
+    response.headers["ETag"] = etag
+    if not request.defer_enrichment and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "X-Quest-Sources": sources_header, "X-Cache": cache_status})
+    
+    if request.defer_enrichment:
+        job = generation_store.create(quests)
+        response.headers["X-Generation-Id"] = job.generation_id
+        background_tasks.add_task(_complete_generation, job, sources.events, sources.places)
+    
+    return quests
+
+def _quest_preferences(request: GenerateQuestsRequest) -> dict:
+    return {
+        **(request.preferences or {}),
+        "categories": request.categories or (request.preferences or {}).get("categories"),
+        "radius_km": request.radius_km
+    }
+
+def _pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Quest generation is busy, please retry shortly",
+        headers={"Retry-After": "1"}
     )
+
+async def _fetch_sources(request: GenerateQuestsRequest, defer: bool) -> Tuple[QuestSources, dict]:
+    """Fetch a request's places and events and enrich the events"""
+    # Hot areas are prefetched by the warmer
+    catalog = cell_warmer.catalog(request.location, request.radius_km)
+    if catalog is not None:
+        return catalog.sources, catalog.enrichments
+    
+    # Fetch nearby places and events concurrently
+    sources = await fetch_quest_sources(places_api, events_api, request.location, request.radius_km)
     
-    # Generate quests
-    quests = quest_gen.generate_quests(
-        places=places,
-        events=events,
+    # Enrich events with Gemini under a bounded time budget. Deferred requests
+    # only use cached enrichments now and get the rest in the background.
+    enrichments = await quest_gen.enrich_events_async(sources.events, budget=0 if defer else None)
+    return sources, enrichments
+
+async def _generate(request: GenerateQuestsRequest, preferences: dict) -> Tuple[List[Quest], QuestSources]:
+    """Fetch sources, enrich events and generate quests for a request"""
+    sources, enrichments = await _fetch_sources(request, request.defer_enrichment)
+    
+    # Generate quests in the worker pool so the event loop stays responsive
+    quests = await generation_pool.generate(
+        places=sources.places,
+        events=sources.events,
         user_location=request.location,
-        preferences={
-            "categories": request.categories,
-            "radius_km": request.radius_km
-        }
+        preferences=preferences,
+        enrichments=enrichments
     )
+    return quests, sources
+
+async def _generate_for_cache(request: GenerateQuestsRequest, preferences: dict) -> Tuple[List[Quest], str, bool]:
+    quests, sources = await _generate(request, preferences)
+    return quests, sources.header(), sources.complete
+
+async def _quest_page(
+    request: GenerateQuestsRequest,
+    preferences: dict,
+    response: Response,
+    if_none_match: Optional[str]
+):
+    """
+    One page of /quests/generate. Paginated requests skip the response
+    cache and are always fully enriched, since later pages are built from
+    the first page's enrichments.
+    """
+    limit = min(max(request.limit or QUEST_PAGE_SIZE, 1), QUEST_PAGE_MAX_SIZE)
+    if request.cursor:
+        try:
+            page_set, offset = quest_pages.resolve(request.cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if page_set is None:
+            raise HTTPException(status_code=410, detail="Cursor expired, request the first page again")
+    else:
+        try:
+            sources, enrichments = await _fetch_sources(request, defer=False)
+            ranked = await generation_pool.rank(
+                places=sources.places,
+                events=sources.events,
+                user_location=request.location,
+                preferences=preferences,
+                enrichments=enrichments,
+                limit=QUEST_PAGE_MAX_RESULTS
+            )
+        except PoolSaturated:
+            raise _pool_busy()
+        page_set = quest_pages.create(ranked, sources.header())
+        offset = 0
+    
+    quests = quest_gen.build_ranked(page_set.ranked, offset, offset + limit)
+    headers = {"X-Quest-Sources": page_set.sources, "ETag": quest_etag(quests)}
+    next_cursor = quest_pages.cursor(page_set, offset + limit)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
     
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return quests
 
+@router.post("/quests/generate/stream")
+async def stream_quests(request: GenerateQuestsRequest):
+    """
+    Server-sent events variant of /quests/generate
+    
+    Place quests are sent (`event: quest`) as each page of places arrives,
+    event quests as soon as events are fetched and enriched. Titles are
+    unique, and each family is capped at MAX_QUEST_RESULTS quests, so
+    early place pages can't crowd out event quests that arrive later.
+    Events are waited for until the fetch deadline. The stream ends with
+    `event: complete`, whose data carries the sources status.
+    """
+    preferences = _quest_preferences(request)
+    location = request.location
+    cell_warmer.record(location, request.radius_km, preferences)
+    
+    async def fetch_events():
+        events = await asyncio.wait_for(
+            events_api.search_events_async(location.lat, location.lng, request.radius_km),
+            QUEST_FETCH_DEADLINE_SECONDS
+        )
+        return events, await quest_gen.enrich_events_async(events)
+    
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + QUEST_FETCH_DEADLINE_SECONDS
+        pages = places_api.iter_nearby_pages(location.lat, location.lng, request.radius_km)
+        page_task = asyncio.ensure_future(anext(pages))
+        events_task = asyncio.ensure_future(fetch_events())
+        pending = {page_task, events_task}
+        places: List[Place] = []
+        events: List[Event] = []
+        enrichments = {}
+        status = {"places": SOURCE_PARTIAL, "events": SOURCE_SKIPPED}
+        sent = {PLACE_FAMILY: set(), EVENT_FAMILY: set()}  # quest ids per family
+        sent_titles = set()
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break  # out of time; whatever is still pending is reported as not complete
+                
+                families = []
+                if page_task in done:
+                    pending.discard(page_task)
+                    try:
+                        places.extend(page_task.result())
+                    except StopAsyncIteration:
+                        status["places"] = SOURCE_COMPLETE
+                    else:
+                        families.append(PLACE_FAMILY)
+                        if status["events"] == SOURCE_COMPLETE:
+                            families.append(EVENT_FAMILY)  # new food places to pair with events
+                        page_task = asyncio.ensure_future(anext(pages))
+                        pending.add(page_task)
+                
+                if events_task in done:
+                    pending.discard(events_task)
+                    try:
+                        events, enrichments = events_task.result()
+                        status["events"] = SOURCE_COMPLETE
+                        families.append(EVENT_FAMILY)
+                    except Exception as e:
+                        print(f"Error fetching events for stream: {e!r}")
+                
+                for family in dict.fromkeys(families):
+                    family_sent = sent[family]
+                    if len(family_sent) >= MAX_QUEST_RESULTS:
+                        continue
+                    quests = await generation_pool.generate(
+                        places=list(places),
+                        events=events,
+                        user_location=location,
+                        preferences=preferences,
+                        enrichments=enrichments,
+                        families=(family,)
+                    )
+                    for quest in quests:
+                        if len(family_sent) >= MAX_QUEST_RESULTS:
+                            break
+                        if quest.quest_id in family_sent or quest.title in sent_titles:
+                            continue
+                        family_sent.add(quest.quest_id)
+                        sent_titles.add(quest.title)
+                        yield f"event: quest\ndata: {quest.model_dump_json()}\n\n"
+        except PoolSaturated:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Quest generation is busy, please retry shortly'})}\n\n"
+            return
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        if not places:
+            status["places"] = SOURCE_SKIPPED
+        sources = ", ".join(f"{source}={value}" for source, value in status.items())
+        count = sum(len(ids) for ids in sent.values())
+        yield f"event: complete\ndata: {json.dumps({'quests': count, 'sources': sources})}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+async def _complete_generation(job: GenerationJob, events: List[Event], places: List[Place]):
+    """Enrich a deferred generation's events and publish the rebuilt quests"""
+    try:
+        enrichments = await quest_gen.enrich_events_async(events)
+        job.update(quest_gen.reenrich_quests(list(job.quests.values()), events, places, enrichments))
+    except Exception as e:
+        logger.error(f"Deferred enrichment failed for generation {job.generation_id}: {e}")
+    finally:
+        job.complete()
+
+@router.get("/quests/generations/{generation_id}", response_model=QuestGeneration)
+async def get_generation(generation_id: str):
+    """Poll a deferred generation for its latest quests"""
+    job = generation_store.get(generation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation not found or expired")
+    return job.snapshot()
+
+@router.get("/quests/generations/{generation_id}/events")
+async def stream_generation(generation_id: str):
+    """Server-sent events stream of quests updated by a deferred generation"""
+    job = generation_store.get(generation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation not found or expired")
+    
+    async def event_stream():
+        sent = 0
+        while True:
+            for quest in job.updates[sent:]:
+                yield f"event: quest\ndata: {quest.model_dump_json()}\n\n"
+            sent = len(job.updates)
+            if job.status == STATUS_COMPLETE:
+                yield f"event: complete\ndata: {json.dumps({'generation_id': job.generation_id})}\n\n"
+                return
+            if not await job.wait_for_change(timeout=15):
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # In-memory storage for favorites and completions
 favorites_db: List[Favorite] = []
 completions_db: List[QuestCompletion] = []
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight call.
+
+    The first caller starts the work; callers that arrive while it is running
+    await the same result instead of repeating the upstream request.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        # Futures belong to one event loop, so keys are scoped per loop
+        scoped = (id(asyncio.get_running_loop()), key)
+        future = self._inflight.get(scoped)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[scoped] = future
+            future.add_done_callback(lambda _: self._inflight.pop(scoped, None))
+        # Shield so one caller giving up does not cancel the shared call
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class BackgroundTasks:
+    """
+    Fire-and-forget tasks, at most one running per key.
+
+    The event loop only keeps weak references to tasks, so running ones are
+    held here until they finish instead of being garbage-collected.
+    """
+
+    def __init__(self):
+        self._running: Dict[Hashable, asyncio.Task] = {}
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[object]]) -> bool:
+        """Start fn() unless a task for key is still running; returns whether it started"""
+        if key in self._running:
+            return False
+        task = asyncio.ensure_future(fn())
+        self._running[key] = task
+        task.add_done_callback(lambda _: self._running.pop(key, None))
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._running
+
+    def __len__(self) -> int:
+        return len(self._running)
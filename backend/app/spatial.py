@@ -0,0 +1,46 @@
+import math
+import heapq
+from typing import Dict, List, Tuple
+from app.models import Place
+from app.geo import KM_PER_DEGREE_LAT, haversine_km
+
+
+class PlaceGrid:
+    """
+    Uniform lat/lng grid over places with a location, for radius and
+    nearest-neighbour queries. Build once per request; a query only scans
+    the cells that can reach its radius.
+    """
+
+    def __init__(self, places: List[Place], cell_km: float):
+        located = [p for p in places if p.location]
+        ref_lat = sum(p.location.lat for p in located) / len(located) if located else 0.0
+        self.cell_lat = cell_km / KM_PER_DEGREE_LAT
+        self.cell_lng = cell_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(ref_lat)), 1e-6))
+        self._cells: Dict[Tuple[int, int], List[Place]] = {}
+        for place in located:
+            self._cells.setdefault(self._cell(place.location.lat, place.location.lng), []).append(place)
+
+    def __len__(self) -> int:
+        return sum(len(cell) for cell in self._cells.values())
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[float, Place]]:
+        """(distance_km, place) for every place within radius_km, unordered"""
+        row, col = self._cell(lat, lng)
+        rows = math.ceil(radius_km / KM_PER_DEGREE_LAT / self.cell_lat)
+        cols = math.ceil(radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6)) / self.cell_lng)
+        found = []
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                for place in self._cells.get((r, c), ()):
+                    distance = haversine_km(lat, lng, place.location.lat, place.location.lng)
+                    if distance <= radius_km:
+                        found.append((distance, place))
+        return found
+
+    def nearest(self, lat: float, lng: float, k: int, radius_km: float) -> List[Place]:
+        """Up to k places within radius_km, closest first"""
+        return [place for _, place in heapq.nsmallest(k, self.within(lat, lng, radius_km), key=lambda hit: hit[0])]
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_lat), math.floor(lng / self.cell_lng)
@@ -1,8 +1,24 @@
 import os
-import requests
-from typing import List, Optional
-from datetime import datetime
+import math
+import asyncio
+import httpx
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from app.models import Event, Location
+from app.http_client import get_async_client, make_timeout, run_sync
+from app.single_flight import BackgroundTasks, SingleFlight
+from app.event_cache import EventCache, EventFetchPlan, EventWindow
+from app.ttl_cache import FRESH
+
+MAX_PAGE_SIZE = 200
+# Ticketmaster refuses to page past the 1000th result of one query
+MAX_DEEP_RESULTS = 1000
+# Date ranges longer than this are split into windows, keeping each under the deep-paging limit
+EVENT_WINDOW_DAYS = float(os.getenv("TICKETMASTER_WINDOW_DAYS", "7"))
+# Ticketmaster allows ~5 requests/second per key
+TICKETMASTER_CONCURRENCY = int(os.getenv("TICKETMASTER_CONCURRENCY", "4"))
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 class TicketmasterAPI:
     """Integration with Ticketmaster Discovery API"""
@@ -10,6 +26,9 @@ class TicketmasterAPI:
     def __init__(self):
         self.api_key = os.getenv("TICKETMASTER_API_KEY")
         self.base_url = "https://app.ticketmaster.com/discovery/v2"
+        self._inflight = SingleFlight()
+        self.cache = EventCache()
+        self._refreshes = BackgroundTasks()
     
     def search_events(
         self,
@@ -18,30 +37,193 @@ class TicketmasterAPI:
         radius: float = 25,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        size: int = 20
+        size: int = 20,
+        timeout: Optional[float] = None
+    ) -> List[Event]:
+        """Blocking wrapper around search_events_async for synchronous callers"""
+        return run_sync(self.search_events_async(lat, lng, radius, start_date, end_date, size, timeout=timeout))
+    
+    async def search_events_async(
+        self,
+        lat: float,
+        lng: float,
+        radius: float = 25,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        size: int = 20,
+        timeout: Optional[float] = None
     ) -> List[Event]:
         """
         Search for events near a location
         
+        Results come from the event cache when a cached search covers this
+        cell, radius and date range; stale entries are returned immediately
+        and refreshed in the background. Misses fetch the whole cell's
+        window, splitting large queries into date windows whose pages are
+        fetched concurrently. Concurrent misses for one cell share a fetch.
+        
         Args:
             lat: Latitude
             lng: Longitude
             radius: Search radius in km
             start_date: Start date in format YYYY-MM-DDTHH:MM:SSZ
             end_date: End date in format YYYY-MM-DDTHH:MM:SSZ
-            size: Number of results to return (max 200)
+            size: Number of results to return
+            timeout: Per-request timeout in seconds (defaults to UPSTREAM_TIMEOUT_SECONDS)
+        
+        Returns:
+            List of Event objects sorted by start time
+        """
+        cached = self.cache.lookup(lat, lng, radius, start_date, end_date, size)
+        if cached is not None:
+            events, state, plan = cached
+            if state != FRESH:
+                self._refresh_in_background(plan, timeout)
+            return list(events)
+        
+        plan = self.cache.plan(lat, lng, radius, start_date, end_date, size)
+        window = await self._fill(plan, timeout)
+        return self.cache.select(window, lat, lng, radius, start_date, end_date, size)
+    
+    async def _fill(self, plan: EventFetchPlan, timeout: Optional[float] = None) -> EventWindow:
+        """Fetch a cache window, sharing the fetch with concurrent misses for the same cell and size"""
+        return await self._inflight.do(plan.fetch_key, lambda: self._fetch_plan(plan, timeout))
+    
+    async def _fetch_plan(self, plan: EventFetchPlan, timeout: Optional[float] = None) -> EventWindow:
+        events, ok = await self._search_events(
+            plan.lat, plan.lng, plan.radius, plan.start_date, plan.end_date, plan.size, timeout
+        )
+        if ok:
+            return self.cache.store(plan, events)
+        # Don't cache failed fetches; answer this request from what did arrive
+        return EventWindow(plan, events)
+    
+    def _refresh_in_background(self, plan: EventFetchPlan, timeout: Optional[float] = None):
+        self._refreshes.start(plan.fetch_key, lambda: self._fill(plan, timeout))
+    
+    async def _search_events(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        size: int,
+        timeout: Optional[float]
+    ) -> Tuple[List[Event], bool]:
+        """
+        Fetch date windows in date order, each only for the events still
+        needed, stopping once `size` events have arrived
         
         Returns:
-            List of Event objects
+            (events, ok) - ok is False if any page failed to load
         """
+        if not self.api_key:
+            print("ERROR: TICKETMASTER_API_KEY not found in environment variables!")
+            return [], False
+        
+        user_location = Location(lat=lat, lng=lng)
+        semaphore = asyncio.Semaphore(TICKETMASTER_CONCURRENCY)
+        windows = self._date_windows(start_date, end_date)
+        
+        # Results are date-sorted, so later windows are only needed while earlier ones fall short
+        events = {}
+        ok = True
+        fetched = 0
+        for window_start, window_end in windows:
+            remaining = size - len(events)
+            if remaining <= 0:
+                break
+            window_events, window_ok = await self._fetch_window(
+                semaphore, user_location, radius, window_start, window_end, remaining, timeout
+            )
+            ok = ok and window_ok
+            fetched += 1
+            # Drop events that appear in more than one window
+            for event in window_events:
+                events.setdefault(event.event_id, event)
+        
+        merged = sorted(
+            events.values(),
+            key=lambda e: (e.start_time is None, e.start_time.timestamp() if e.start_time else 0)
+        )
+        if len(windows) > 1:
+            print(f"Fetched {len(merged)} events across {fetched}/{len(windows)} date windows")
+        return merged[:size], ok
+    
+    def _date_windows(self, start_date: Optional[str], end_date: Optional[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Split a bounded date range into EVENT_WINDOW_DAYS-long windows"""
+        if not start_date or not end_date:
+            return [(start_date, end_date)]
+        try:
+            start = datetime.strptime(start_date, DATE_FORMAT).replace(tzinfo=timezone.utc)
+            end = datetime.strptime(end_date, DATE_FORMAT).replace(tzinfo=timezone.utc)
+        except ValueError:
+            return [(start_date, end_date)]
+        
+        step = timedelta(days=EVENT_WINDOW_DAYS)
+        windows = []
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + step, end)
+            windows.append((window_start.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)))
+            window_start = window_end
+        return windows or [(start_date, end_date)]
+    
+    async def _fetch_window(
+        self,
+        semaphore: asyncio.Semaphore,
+        user_location: Location,
+        radius: float,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        size: int,
+        timeout: Optional[float]
+    ) -> Tuple[List[Event], bool]:
+        """Fetch the first page of a window, then its remaining pages concurrently"""
+        page_size = min(size, MAX_PAGE_SIZE)
+        first = await self._fetch_page(
+            semaphore, user_location, radius, start_date, end_date, page_size, 0, timeout
+        )
+        if first is None:
+            return [], False
+        events, total_pages = first
+        
+        ok = True
+        pages_needed = min(total_pages, math.ceil(size / page_size), MAX_DEEP_RESULTS // page_size)
+        if pages_needed > 1:
+            pages = await asyncio.gather(*(
+                self._fetch_page(semaphore, user_location, radius, start_date, end_date, page_size, page, timeout)
+                for page in range(1, pages_needed)
+            ))
+            for page in pages:
+                if page is None:
+                    ok = False
+                    continue
+                events.extend(page[0])
+        return events, ok
+    
+    async def _fetch_page(
+        self,
+        semaphore: asyncio.Semaphore,
+        user_location: Location,
+        radius: float,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        page_size: int,
+        page: int,
+        timeout: Optional[float]
+    ) -> Optional[Tuple[List[Event], int]]:
+        """Fetch one page of results; returns (events, total pages) or None on error"""
         url = f"{self.base_url}/events.json"
         
         params = {
             "apikey": self.api_key,
-            "latlong": f"{lat},{lng}",
+            "latlong": f"{user_location.lat},{user_location.lng}",
             "radius": radius,
             "unit": "km",
-            "size": min(size, 200),
+            "size": page_size,
+            "page": page,
             "sort": "date,asc"
         }
         
@@ -51,22 +233,24 @@ class TicketmasterAPI:
             params["endDateTime"] = end_date
         
         try:
-            response = requests.get(url, params=params)
+            async with semaphore:
+                response = await get_async_client().get(url, params=params, timeout=make_timeout(timeout))
             response.raise_for_status()
             data = response.json()
             
             events = []
             embedded = data.get("_embedded", {})
             for event_data in embedded.get("events", []):
-                event = self._parse_event(event_data, location)
+                event = self._parse_event(event_data, user_location)
                 if event:
                     events.append(event)
             
-            return events
+            return events, data.get("page", {}).get("totalPages", 1)
         
-        except requests.RequestException as e:
-            print(f"Error fetching events: {e}")
-            return []
+        except (httpx.HTTPError, ValueError) as e:
+            # ValueError covers non-JSON bodies
+            print(f"Error fetching events (page {page}): {e!r}")
+            return None
     
     def _parse_event(self, data: dict, user_location: Location) -> Optional[Event]:
         """Parse Ticketmaster API result into Event model"""
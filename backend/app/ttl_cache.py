@@ -0,0 +1,63 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after a TTL.
+
+    Entries can outlive their TTL by `stale_ttl` seconds; during that window
+    get_entry() still returns them, flagged STALE, so callers can serve the
+    old value while they refresh it.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, stale_ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value if it is still fresh, else None"""
+        value, state = self.get_entry(key)
+        return value if state == FRESH else None
+
+    def get_entry(self, key: Hashable) -> Tuple[Optional[Any], Optional[str]]:
+        """Return (value, FRESH | STALE), or (None, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            value, expires_at = entry
+            now = time.monotonic()
+            if now >= expires_at + self.stale_ttl:
+                del self._entries[key]
+                return None, None
+            self._entries.move_to_end(key)
+            return value, FRESH if now < expires_at else STALE
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
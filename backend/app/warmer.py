@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from app.models import Location
+from app.google_places import GooglePlacesAPI
+from app.ticketmaster import TicketmasterAPI
+from app.quest_generator import QuestGenerator
+from app.quest_sources import QuestSources, fetch_quest_sources
+from app.generation_pool import PoolSaturated, generation_pool
+from app.response_cache import QuestResponseCache
+from app.ttl_cache import TTLCache
+
+QUEST_WARMER_ENABLED = os.getenv("QUEST_WARMER_ENABLED", "true").lower() == "true"
+QUEST_WARMER_INTERVAL_SECONDS = float(os.getenv("QUEST_WARMER_INTERVAL_SECONDS", "60"))
+# At most this many of the busiest cells are kept warm, and only with this many recent requests
+QUEST_WARMER_HOT_CELLS = int(os.getenv("QUEST_WARMER_HOT_CELLS", "20"))
+QUEST_WARMER_MIN_REQUESTS = float(os.getenv("QUEST_WARMER_MIN_REQUESTS", "3"))
+# Request counts halve over this long, so cells cool down once traffic moves on
+QUEST_WARMER_HALF_LIFE_SECONDS = float(os.getenv("QUEST_WARMER_HALF_LIFE_SECONDS", "1800"))
+# Catalogs are refreshed once this old, and dropped (back to live fetches) after the TTL
+QUEST_WARMER_REFRESH_SECONDS = float(os.getenv("QUEST_WARMER_REFRESH_SECONDS", "600"))
+QUEST_WARMER_CATALOG_TTL_SECONDS = float(os.getenv("QUEST_WARMER_CATALOG_TTL_SECONDS", "1200"))
+# Upstream quota for warming: cell refreshes per hour, each one places search + one events search
+QUEST_WARMER_REFRESHES_PER_HOUR = int(os.getenv("QUEST_WARMER_REFRESHES_PER_HOUR", "120"))
+# Preference sets per cell whose responses are precomputed into the response cache
+QUEST_WARMER_VARIANTS = int(os.getenv("QUEST_WARMER_VARIANTS", "3"))
+QUEST_WARMER_MAX_TRACKED_CELLS = int(os.getenv("QUEST_WARMER_MAX_TRACKED_CELLS", "5000"))
+
+
+class CellTraffic:
+    """Decaying request count for a cell, and for each preference set seen there"""
+
+    def __init__(self):
+        self.count = 0.0
+        self.updated = time.monotonic()
+        self.variants: Dict[Tuple, List] = {}  # cache key -> [count, preferences]
+
+    def decayed(self, now: float, half_life: float) -> float:
+        return self.count * 0.5 ** ((now - self.updated) / half_life)
+
+    def record(self, cache_key: Tuple, preferences: dict, now: float, half_life: float):
+        factor = 0.5 ** ((now - self.updated) / half_life)
+        self.count = self.count * factor + 1
+        for variant in self.variants.values():
+            variant[0] *= factor
+        variant = self.variants.setdefault(cache_key, [0.0, preferences])
+        variant[0] += 1
+        variant[1] = preferences
+        self.updated = now
+
+    def top_variants(self, limit: int) -> List[Tuple[Tuple, dict]]:
+        ranked = sorted(self.variants.items(), key=lambda item: -item[1][0])
+        return [(key, preferences) for key, (_, preferences) in ranked[:limit]]
+
+
+class CellCatalog:
+    """Places, events and enrichments prefetched for a hot cell"""
+
+    def __init__(self, sources: QuestSources, enrichments: Dict[str, dict]):
+        self.sources = sources
+        self.enrichments = enrichments
+        self.refreshed_at = time.monotonic()
+
+
+class CellWarmer:
+    """
+    Tracks request density per response-cache cell and keeps catalogs for
+    the busiest cells refreshed in the background, within an hourly budget
+    of upstream refreshes. Requests in a warm cell generate from its
+    catalog without fetching; the cell's most common preference sets also
+    get their responses precomputed into the response cache.
+    """
+
+    def __init__(
+        self,
+        places_api: GooglePlacesAPI,
+        events_api: TicketmasterAPI,
+        quest_gen: QuestGenerator,
+        quest_cache: QuestResponseCache,
+        interval: float = QUEST_WARMER_INTERVAL_SECONDS,
+        hot_cells: int = QUEST_WARMER_HOT_CELLS,
+        min_requests: float = QUEST_WARMER_MIN_REQUESTS,
+        half_life: float = QUEST_WARMER_HALF_LIFE_SECONDS,
+        refresh_after: float = QUEST_WARMER_REFRESH_SECONDS,
+        catalog_ttl: float = QUEST_WARMER_CATALOG_TTL_SECONDS,
+        refreshes_per_hour: int = QUEST_WARMER_REFRESHES_PER_HOUR,
+        variants: int = QUEST_WARMER_VARIANTS
+    ):
+        self.places_api = places_api
+        self.events_api = events_api
+        self.quest_gen = quest_gen
+        self.quest_cache = quest_cache
+        self.interval = interval
+        self.hot_cells = hot_cells
+        self.min_requests = min_requests
+        self.half_life = half_life
+        self.refresh_after = refresh_after
+        self.refreshes_per_hour = refreshes_per_hour
+        self.variants = variants
+        self._traffic: Dict[Tuple, CellTraffic] = {}
+        self._catalogs = TTLCache(max_entries=max(1, hot_cells * 2), ttl=catalog_ttl)
+        self._refreshes = deque()  # monotonic times of refreshes in the last hour
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, location: Location, radius_km: float, preferences: dict):
+        """Count a quest request towards its cell's heat"""
+        cell = self.quest_cache.cell(location, radius_km)
+        traffic = self._traffic.get(cell)
+        if traffic is None:
+            if len(self._traffic) >= QUEST_WARMER_MAX_TRACKED_CELLS:
+                self._forget_cold(time.monotonic())
+            traffic = self._traffic[cell] = CellTraffic()
+        cache_key = self.quest_cache.key(location, radius_km, preferences)
+        traffic.record(cache_key, preferences, time.monotonic(), self.half_life)
+
+    def catalog(self, location: Location, radius_km: float) -> Optional[CellCatalog]:
+        """The prefetched catalog for a request's cell, if the cell is warm"""
+        return self._catalogs.get(self.quest_cache.cell(location, radius_km))
+
+    def hot(self, now: Optional[float] = None) -> List[Tuple[Tuple, CellTraffic]]:
+        """Cells busy enough to keep warm, busiest first"""
+        now = time.monotonic() if now is None else now
+        busy = [
+            (traffic.decayed(now, self.half_life), cell, traffic)
+            for cell, traffic in self._traffic.items()
+        ]
+        busy = sorted((item for item in busy if item[0] >= self.min_requests), key=lambda item: -item[0])
+        return [(cell, traffic) for _, cell, traffic in busy[:self.hot_cells]]
+
+    async def warm_once(self) -> int:
+        """Refresh hot cells whose catalogs are missing or old; returns how many were refreshed"""
+        now = time.monotonic()
+        self._forget_cold(now)
+        refreshed = 0
+        for cell, traffic in self.hot(now):
+            catalog = self._catalogs.get(cell)
+            if catalog is not None and now - catalog.refreshed_at < self.refresh_after:
+                continue
+            if not self._spend(now):
+                print(f"Warmer upstream budget spent ({self.refreshes_per_hour}/hour), skipping remaining cells")
+                break
+            try:
+                await self._warm(cell, traffic)
+                refreshed += 1
+            except PoolSaturated:
+                break  # live requests come first; try again next cycle
+            except Exception as e:
+                print(f"Warming cell {cell} failed: {e!r}")
+        return refreshed
+
+    def start(self) -> Optional[asyncio.Task]:
+        if QUEST_WARMER_ENABLED and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.warm_once()
+            except Exception as e:
+                print(f"Warmer cycle failed: {e!r}")
+
+    async def _warm(self, cell: Tuple, traffic: CellTraffic):
+        center = self.quest_cache.cell_center(cell)
+        radius_km = cell[2]
+        sources = await fetch_quest_sources(self.places_api, self.events_api, center, radius_km)
+        if not sources.complete:
+            # Keep serving live fetches (and any older catalog) rather than a degraded catalog
+            print(f"Not warming cell {cell} from partial sources: {sources.header()}")
+            return
+        enrichments = await self.quest_gen.enrich_events_async(sources.events)
+        self._catalogs.set(cell, CellCatalog(sources, enrichments))
+
+        for cache_key, preferences in traffic.top_variants(self.variants):
+            quests = await generation_pool.generate(
+                places=sources.places,
+                events=sources.events,
+                user_location=center,
+                preferences=preferences,
+                enrichments=enrichments
+            )
+            self.quest_cache.store(cache_key, center, quests, sources.header())
+
+    def _spend(self, now: float) -> bool:
+        while self._refreshes and now - self._refreshes[0] >= 3600:
+            self._refreshes.popleft()
+        if len(self._refreshes) >= self.refreshes_per_hour:
+            return False
+        self._refreshes.append(now)
+        return True
+
+    def _forget_cold(self, now: float):
+        """Stop tracking cells whose traffic has decayed away"""
+        for cell in [cell for cell, traffic in self._traffic.items() if traffic.decayed(now, self.half_life) < 0.05]:
+            del self._traffic[cell]
+        if len(self._traffic) >= QUEST_WARMER_MAX_TRACKED_CELLS:
+            coldest = sorted(self._traffic, key=lambda cell: self._traffic[cell].decayed(now, self.half_life))
+            for cell in coldest[:len(self._traffic) - QUEST_WARMER_MAX_TRACKED_CELLS + 1]:
+                del self._traffic[cell]
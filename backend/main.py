@@ -1,16 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
-from app.routes import router as api_router
+from app.routes import router as api_router, cell_warmer
+from app.http_client import close_async_clients
+from app.generation_pool import generation_pool
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks"""
+    # Keep quest sources for busy areas prefetched
+    cell_warmer.start()
+    yield
+    await cell_warmer.stop()
+    # Release pooled upstream connections and generation workers
+    await close_async_clients()
+    generation_pool.shutdown()
+
 app = FastAPI(
     title="SideQuest API",
     description="Backend API for SideQuest - Location-aware adventure generator",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Quest-Sources", "X-Generation-Id", "X-Cache", "ETag", "X-Next-Cursor"],
 )
 
 # Include API routes
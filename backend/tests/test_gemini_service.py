@@ -0,0 +1,94 @@
+import json
+from app.gemini_service import GeminiService
+from app.enrichment_cache import EnrichmentCache
+from app.quest_generator import QuestGenerator
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Answers every prompt with the same reply"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return _Response(json.dumps(self.reply))
+
+
+def make_service(reply) -> GeminiService:
+    service = GeminiService()
+    service.model = StubModel(reply)
+    service.cache = EnrichmentCache(db_path=None)
+    return service
+
+
+VALID = {"estimated_cost": 25, "estimated_time": 90.6, "categories": ["Music", "Live"], "difficulty": "medium_energy"}
+
+
+def test_valid_reply_is_normalized_and_cached():
+    service = make_service(VALID)
+    first = service.enrich_quest_item("Show", "A concert", item_id="e1")
+    assert first["estimated_time"] == 91
+    assert first["categories"] == ["Music", "Live"]
+
+    service.enrich_quest_item("Show", "A concert", item_id="e1")
+    assert service.model.calls == 1
+
+
+def test_malformed_replies_fall_back_and_are_not_cached():
+    malformed = [
+        {**VALID, "categories": []},
+        {**VALID, "categories": "Music"},
+        {**VALID, "categories": ["Music", 3]},
+        {**VALID, "difficulty": "extreme"},
+        {**VALID, "estimated_time": "an hour"},
+    ]
+    for reply in malformed:
+        service = make_service(reply)
+        result = service.enrich_quest_item("Show", "A concert", item_id="e1")
+        assert result == service._get_fallback_enrichment("Show")
+        service.enrich_quest_item("Show", "A concert", item_id="e1")
+        assert service.model.calls == 2, reply
+
+
+def test_quest_profile_tolerates_empty_categories():
+    generator = QuestGenerator()
+    category, _, tags = generator._quest_profile("event", (), {"estimated_cost": 10, "categories": []})
+    assert category == "event"
+    assert tags
+
+
+class BatchStubModel:
+    """Answers batch prompts with one malformed element (id "2") and item prompts with VALID"""
+
+    def __init__(self):
+        self.item_calls = 0
+
+    def generate_content(self, prompt):
+        if '"id": "1"' in prompt:
+            return _Response(json.dumps([
+                {"id": "1", **VALID},
+                {"id": "2", **VALID, "categories": []},
+                {"id": "3", **VALID},
+            ]))
+        self.item_calls += 1
+        return _Response(json.dumps({**VALID, "categories": ["Retried"]}))
+
+
+def test_malformed_batch_element_is_retried_not_cached():
+    service = GeminiService()
+    service.model = BatchStubModel()
+    service.cache = EnrichmentCache(db_path=None)
+    items = [{"name": f"Event {i}", "description": "d", "item_id": f"e{i}"} for i in range(1, 4)]
+
+    results = service.enrich_quest_items(items)
+
+    assert [r["categories"] for r in results] == [["Music", "Live"], ["Retried"], ["Music", "Live"]]
+    assert service.model.item_calls == 1
+    assert service.cache.get(service._item_key(items[1]))["categories"] == ["Retried"]
@@ -0,0 +1,47 @@
+import itertools
+from app.models import Location, Place
+from app.quest_generator import QuestGenerator, TEMPLATE_CAPS
+
+
+def make_place(place_id: str, name: str, types: str, rating: float) -> Place:
+    return Place(
+        place_id=place_id,
+        name=name,
+        category=types,
+        rating=rating,
+        price_level=2,
+        location=Location(lat=43.26, lng=-79.92)
+    )
+
+
+def distinct_titles(generator, template, first, second, same):
+    pairs = itertools.combinations(first, 2) if same else itertools.product(first, second)
+    return {generator._quest_title(template, pair) for pair in pairs if pair[0].place_id != pair[1].place_id}
+
+
+def test_pair_caps_count_distinct_titles_when_places_share_a_name():
+    generator = QuestGenerator()
+    restaurants = [
+        make_place(f"r{i}", "Tim Hortons" if i in (3, 4) else f"Restaurant {i}", "restaurant, food", 5 - i * 0.1)
+        for i in range(13)
+    ]
+    bars = [make_place("b0", "The Bar", "bar", 4.0)]
+
+    food_tours = generator._pair_candidates("food_tour", restaurants, restaurants)
+    night_outs = generator._pair_candidates("night_out", restaurants, bars)
+
+    for template, candidates, expected in (
+        ("food_tour", food_tours, distinct_titles(generator, "food_tour", restaurants, restaurants, same=True)),
+        ("night_out", night_outs, distinct_titles(generator, "night_out", restaurants, bars, same=False)),
+    ):
+        titles = [c.title for c in candidates]
+        assert len(titles) == len(set(titles))
+        assert len(candidates) == min(TEMPLATE_CAPS[template], len(expected))
+
+
+def test_single_title_templates_yield_one_candidate():
+    generator = QuestGenerator()
+    cafes = [make_place(f"c{i}", f"Cafe {i}", "cafe", 4.5) for i in range(5)]
+    parks = [make_place(f"p{i}", f"Park {i}", "park", 4.0) for i in range(5)]
+
+    assert len(generator._pair_candidates("coffee_walk", cafes, parks)) == 1
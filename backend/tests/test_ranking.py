@@ -0,0 +1,25 @@
+import pytest
+from app.ranking import CATEGORY_WEIGHT, score_quests
+
+
+def score(tags, categories):
+    return score_quests(
+        costs=[30.0] * len(tags),
+        distances=[1.0] * len(tags),
+        ratings=[4.0] * len(tags),
+        tags=tags,
+        preferences={"budget": "moderate", "categories": categories, "radius_km": 5}
+    )
+
+
+def test_frontend_categories_match_quest_tags():
+    tags = [["budget", "cheap", "food"], ["exploration", "hidden gems"], ["food", "local favorites"], ["arts"]]
+    scores = score(tags, ["Cheap Food", "Hidden Gem", "Local Fav"])
+    baseline = score(tags, [])
+
+    assert list(scores - baseline) == pytest.approx([CATEGORY_WEIGHT] * 3 + [0.0])
+
+
+def test_blank_categories_match_nothing():
+    tags = [["food"], ["arts"]]
+    assert list(score(tags, ["", "  "])) == pytest.approx(list(score(tags, [])))
@@ -0,0 +1,29 @@
+import asyncio
+from app.single_flight import BackgroundTasks
+
+
+def test_background_tasks_run_once_per_key_and_are_released():
+    async def scenario():
+        tasks = BackgroundTasks()
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+
+        assert tasks.start("cell", work)
+        assert not tasks.start("cell", work)
+        assert "cell" in tasks
+        await asyncio.sleep(0)
+
+        release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert len(tasks) == 0
+        assert tasks.start("cell", work)
+        release.set()
+        await asyncio.sleep(0)
+        return runs
+
+    assert len(asyncio.run(scenario())) == 2
@@ -22,6 +22,7 @@ export interface QuestStep {
   estimated_time?: number;
   location: Location;
   photo_url?: string;
+  leg_distance?: number;
 }
 
 export interface Location {